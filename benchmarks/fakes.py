@@ -0,0 +1,109 @@
+#!/usr/bin/env python3
+# -*- coding=utf-8 -*-
+
+"""headless stand-ins for a flet client, used by the benchmarks
+
+fake_page() returns a real ft.Page on a FakeConnection, so page.update()
+builds the same diffs as in an app, which are counted and sized instead
+of being sent to a client.
+"""
+
+import json
+import time
+from typing import Any
+
+import flet as ft
+from flet.core.protocol import CommandEncoder, PageCommandsBatchResponsePayload
+from flet.core.pubsub.pubsub_hub import PubSubHub
+
+
+class FakeConnection:
+    page_name = ""
+    page_url = "http://localhost"
+
+    def __init__(self) -> None:
+        self.pubsubhub = PubSubHub()
+        self.next_id = 1
+        self.reset()
+
+    def reset(self) -> None:
+        self.batches = 0
+        self.commands = 0
+        self.bytes = 0
+
+    def get_ids(self, command: Any) -> str:
+        ids = []
+        for cmd in ([command] if command.values else []) + command.commands:
+            if not (cid := cmd.attrs.get("id")):
+                cid = cmd.attrs["id"] = f"_{self.next_id}"
+                self.next_id += 1
+
+            ids.append(cid)
+
+        return " ".join(ids)
+
+    def send_commands(self, session_id: str, commands: list) -> Any:
+        self.batches += 1
+        self.commands += len(commands)
+        self.bytes += len(json.dumps(commands, cls=CommandEncoder, separators=(",", ":")))
+        results = [
+            self.get_ids(cmd) if cmd.name == "add" else "" for cmd in commands if cmd.name in ("add", "get")
+        ]
+        return PageCommandsBatchResponsePayload(results=results, error="")
+
+    def send_command(self, session_id: str, command: Any) -> Any:
+        return self.send_commands(session_id, [command])
+
+
+class FakeClientStorage:
+    """page.client_storage in memory, latency simulates the client round trip"""
+
+    def __init__(self, latency: float = 0) -> None:
+        self.data = {}
+        self.latency = latency
+        self.calls = 0
+
+    def wait(self) -> None:
+        self.calls += 1
+        if self.latency:
+            time.sleep(self.latency)
+
+    def get(self, key: str) -> Any:
+        self.wait()
+        return self.data.get(key)
+
+    def set(self, key: str, value: Any) -> bool:
+        self.wait()
+        self.data[key] = json.loads(json.dumps(value))
+        return True
+
+    def contains_key(self, key: str) -> bool:
+        self.wait()
+        return key in self.data
+
+    def remove(self, key: str) -> bool:
+        self.wait()
+        return self.data.pop(key, None) is not None
+
+    def get_keys(self, key_prefix: str) -> list:
+        self.wait()
+        return [k for k in self.data if k.startswith(key_prefix)]
+
+    def clear(self) -> bool:
+        self.wait()
+        self.data.clear()
+        return True
+
+
+def fake_page(latency: float = 0, **kwargs: Any) -> ft.Page:
+    """ft.Page on a FakeConnection, page.conn and page.storage_backend are the fakes"""
+    conn = FakeConnection()
+    page = ft.Page(conn, "bench", None)
+    page.conn = conn
+    page.storage_backend = FakeClientStorage(latency)
+    page.teardowns = []
+    page.__app_org__ = kwargs.get("app_org", "bench")
+    page.__app_name__ = kwargs.get("app_name", "fletbox")
+    page.__app_client_key__ = kwargs.get("app_client_key", "client")
+    page.__secret_key__ = kwargs.get("secret_key", "")
+    return page
@@ -0,0 +1,230 @@
+#!/usr/bin/env python3
+# -*- coding=utf-8 -*-
+
+"""fletbox benchmarks on a headless page, no flet client needed
+
+    python benchmarks/run.py                         # all benchmarks, 1k and 10k
+    python benchmarks/run.py -s 1k,1m -b echo,storage_set
+    python benchmarks/run.py --compare benchmarks/results/old.json
+
+each result has the throughput (items/s), page updates, commands and bytes
+sent, and the peak memory traced while it ran. results are saved as json,
+--compare prints the throughput ratio against an older run.
+"""
+
+import argparse
+import gc
+import json
+import platform
+import sys
+import tempfile
+import time
+import tracemalloc
+from datetime import datetime
+from pathlib import Path
+from typing import Any
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+import flet as ft  # noqa: E402
+from fakes import fake_page  # noqa: E402
+
+import fletbox  # noqa: E402
+from fletbox import choices as fbch  # noqa: E402
+from fletbox import consoles as fbc  # noqa: E402
+from fletbox import datasets as fbds  # noqa: E402
+from fletbox import displays as fbdp  # noqa: E402
+from fletbox import helpers as fbh  # noqa: E402
+from fletbox import options as fbo  # noqa: E402
+from fletbox import storages as fbs  # noqa: E402
+from fletbox import tables as fbt  # noqa: E402
+
+SCALES = dict(k=1000, m=1000000)
+BENCHMARKS = {}
+
+
+def benchmark(unit: str, max_scale: int = 0) -> Any:
+    """register func(page, n), benchmarks above max_scale are skipped"""
+
+    def register(func: Any) -> Any:
+        BENCHMARKS[func.__name__.removeprefix("bench_")] = (func, unit, max_scale)
+        return func
+
+    return register
+
+
+def get_rows(n: int, cols: int = 4) -> list:
+    return [[i, f"name {i}", i * 0.5, f"group {i % 10}"][:cols] for i in range(n)]
+
+
+@benchmark("lines")
+def bench_echo(page: ft.Page, n: int, block: int = 1000) -> None:
+    page.lv = fbdp.list_view()
+    page.add(page.lv)
+    helper = fbh.EchoHelper(page, max_lines=5000)
+    for start in range(0, n, block):
+        helper.echo("\n".join(f"line {i}" for i in range(start, min(n, start + block))))
+
+
+@benchmark("lines")
+def bench_echo_virtual(page: ft.Page, n: int, block: int = 1000) -> None:
+    page.lv = fbc.LogView()
+    page.add(page.lv)
+    helper = fbh.EchoHelper(page)
+    for start in range(0, n, block):
+        helper.echo("\n".join(f"line {i}" for i in range(start, min(n, start + block))))
+
+
+@benchmark("rows", max_scale=100000)
+def bench_table(page: ft.Page, n: int) -> None:
+    page.add(fbt.table(["id", "name", "value", "group"], get_rows(n)))
+
+
+@benchmark("rows", max_scale=100000)
+def bench_keyed_table(page: ft.Page, n: int) -> None:
+    rows = get_rows(n)
+    table = fbt.KeyedTable(["id", "name", "value", "group"], rows)
+    page.add(table)
+    # change every 10th row, delete the last 10%, then refresh
+    rows = [[r[0], f"{r[1]}!", *r[2:]] if r[0] % 10 == 0 else r for r in rows[: n - n // 10]]
+    table.update(rows)
+
+
+@benchmark("rows")
+def bench_paged_table(page: ft.Page, n: int) -> None:
+    store = fbds.ColumnStore(["id", "name", "value", "group"], get_rows(n))
+    table = fbt.PagedTable(store.names, store, page_size=50)
+    page.add(table)
+    for col in (2, 1):
+        store.sort(col, ascending=False)
+        for index in range(10):
+            table.go(index)
+
+
+@benchmark("rows", max_scale=100000)
+def bench_pack_row(page: ft.Page, n: int) -> None:
+    page.add(fbdp.column([fbdp.pack_row([fbdp.text(i), fbdp.text("a"), fbdp.text("b")]) for i in range(n)]))
+
+
+@benchmark("options", max_scale=100000)
+def bench_dropdown(page: ft.Page, n: int) -> None:
+    page.add(fbch.dropdown([(f"{i}", f"option {i}") for i in range(n)]))
+
+
+@benchmark("keys", max_scale=100000)
+def bench_storage_set(page: ft.Page, n: int) -> None:
+    helper = fbh.BaseStorage(page)
+    helper.set_many({f"key{i}": dict(i=i) for i in range(n)})
+    helper.get_many([f"key{i}" for i in range(n)])
+
+
+@benchmark("keys", max_scale=100000)
+def bench_storage_cache(page: ft.Page, n: int) -> None:
+    fbo.setup_storage(page, delay=0, backend=page.storage_backend)
+    helper = fbh.BaseStorage(page)
+    for i in range(n):
+        helper.set_key(dict(i=i), f"key{i}")
+
+    for i in range(n):
+        helper.get_key(f"key{i}")
+
+    page.storage_cache.sync()
+
+
+@benchmark("keys")
+def bench_storage_sqlite(page: ft.Page, n: int) -> None:
+    with tempfile.TemporaryDirectory() as folder:
+        helper = fbh.LocalStorage("bench", "fletbox", path=f"{folder}/storage.db")
+        helper.set_many({f"key{i}": dict(i=i) for i in range(n)})
+        helper.get_many([f"key{i}" for i in range(n)])
+        helper.backend.close()
+        fbs.sqlite_storages.clear()
+
+
+def parse_scale(text: str) -> int:
+    text = text.strip().lower()
+    return int(float(text[:-1]) * SCALES[text[-1]]) if text[-1] in SCALES else int(text)
+
+
+def run_one(name: str, n: int, latency: float = 0, memory: bool = True) -> dict:
+    func, unit, max_scale = BENCHMARKS[name]
+    result = dict(benchmark=name, scale=n, unit=unit)
+    if max_scale and n > max_scale:
+        return result | dict(skipped=f"above {max_scale}")
+
+    page = fake_page(latency)
+    gc.collect()
+    if memory:
+        tracemalloc.start()
+
+    started = time.perf_counter()
+    try:
+        func(page, n)
+    finally:
+        elapsed = time.perf_counter() - started
+        peak = tracemalloc.get_traced_memory()[1] if memory else 0
+        if memory:
+            tracemalloc.stop()
+
+    return result | dict(
+        seconds=round(elapsed, 4),
+        throughput=round(n / elapsed, 1) if elapsed else 0,
+        updates=page.conn.batches,
+        commands=page.conn.commands,
+        bytes=page.conn.bytes,
+        peak_kb=peak // 1024,
+    )
+
+
+def compare(results: list, path: str) -> None:
+    old = {(r["benchmark"], r["scale"]): r for r in json.loads(Path(path).read_text())["results"]}
+    for r in results:
+        if (prev := old.get((r["benchmark"], r["scale"]))) and prev.get("throughput") and r.get("throughput"):
+            ratio = r["throughput"] / prev["throughput"]
+            before, after = prev["throughput"], r["throughput"]
+            print(f"{r['benchmark']:>16} {r['scale']:>8}  x{ratio:.2f}  ({before} -> {after})")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="fletbox benchmarks")
+    parser.add_argument("-b", "--benchmarks", default="", help="comma separated, default all")
+    parser.add_argument("-s", "--scales", default="1k,10k", help="e.g. 1k,100k,1m")
+    parser.add_argument("-o", "--out", default="", help="json file, default benchmarks/results/<time>.json")
+    parser.add_argument("--latency", type=float, default=0, help="client_storage round trip in seconds")
+    parser.add_argument("--no-memory", action="store_true", help="do not trace memory, which slows runs")
+    parser.add_argument("--compare", default="", help="json file of an older run")
+    args = parser.parse_args()
+
+    names = [n.strip() for n in args.benchmarks.split(",") if n.strip()] or list(BENCHMARKS)
+    results = []
+    for name in names:
+        for n in map(parse_scale, args.scales.split(",")):
+            result = run_one(name, n, args.latency, not args.no_memory)
+            results.append(result)
+            if "skipped" in result:
+                print(f"{name:>16} {n:>8}  skipped, {result['skipped']}")
+            else:
+                print(
+                    f"{name:>16} {n:>8}  {result['seconds']:>8.3f}s {result['throughput']:>12.0f} "
+                    f"{result['unit']}/s  updates={result['updates']} bytes={result['bytes']} "
+                    f"peak={result['peak_kb']}KB"
+                )
+
+    out = Path(args.out or Path(__file__).parent / "results" / f"{datetime.now():%Y%m%d-%H%M%S}.json")
+    out.parent.mkdir(parents=True, exist_ok=True)
+    meta = dict(
+        time=f"{datetime.now():%Y-%m-%d %H:%M:%S}",
+        fletbox=fletbox.__version__,
+        flet=ft.version.version,
+        python=platform.python_version(),
+        platform=platform.platform(),
+        latency=args.latency,
+    )
+    out.write_text(json.dumps(dict(meta=meta, results=results), indent=2), encoding="utf-8")
+    print(f"saved {out}")
+    if args.compare:
+        compare(results, args.compare)
+
+
+if __name__ == "__main__":
+    main()
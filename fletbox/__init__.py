@@ -1,4 +1,8 @@
 #!/usr/bin/env python3
 # -*- coding=utf-8 -*-
 
+import time
+
 __version__ = "2025.01.10"
+# startup.report() measures from here
+started = time.perf_counter()
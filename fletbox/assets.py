@@ -0,0 +1,256 @@
+#!/usr/bin/env python3
+# -*- coding=utf-8 -*-
+
+import base64
+import hashlib
+import json
+import os
+import threading
+import time
+from pathlib import Path
+from typing import Any
+
+FONT_SUFFIXES = {".ttf", ".otf", ".ttc", ".woff", ".woff2"}
+ICON_SUFFIXES = {".ico", ".png", ".svg", ".icns", ".jpg", ".jpeg", ".gif", ".webp"}
+
+assets_dirs = {}
+asset_indexes = {}
+assets_root = ""  # assets dir of the app, set by helpers.run_app() or found on first use
+lock = threading.Lock()
+svg_files = {}  # path: (mtime, digest)
+svg_blobs = {}  # digest: base64, files with the same content share one string
+svg_lock = threading.Lock()
+
+
+def get_mtime(path: Any) -> float:
+    try:
+        return os.stat(path).st_mtime
+    except OSError:
+        return -1.0
+
+
+def scan_assets_dir(current_dir: str = ".") -> tuple:
+    """return (assets dir, {listed dir: mtime}), looks one level deep"""
+    mtimes = {current_dir: get_mtime(current_dir)}
+    for fp in Path(current_dir).iterdir():
+        if fp.is_dir():
+            if fp.name == "assets":
+                return fp.name, mtimes
+
+            mtimes[str(fp)] = get_mtime(fp)
+            for ffp in fp.iterdir():
+                if ffp.is_dir() and ffp.name == "assets":
+                    return str(ffp).replace("\\", "/"), mtimes
+
+    return "assets", mtimes
+
+
+def is_fresh(entry: Any) -> bool:
+    # a folder's mtime changes when entries are added to or removed from it
+    return bool(entry) and all(get_mtime(path) == mtime for path, mtime in entry["mtimes"].items())
+
+
+def load_cache(cache_path: str) -> dict:
+    try:
+        return json.loads(Path(cache_path).read_text(encoding="utf-8"))
+    except (OSError, ValueError):
+        return {}
+
+
+def save_cache(cache_path: str, cache: dict) -> None:
+    try:
+        Path(cache_path).write_text(json.dumps(cache), encoding="utf-8")
+    except OSError:
+        pass
+
+
+def find_assets_dir(current_dir: str = ".", cache_path: str = "") -> str:
+    """cached helpers.get_assets_dir, a cache_path keeps the result between runs
+
+    cached results are reused until the mtime of a listed folder changes.
+    """
+    key = str(Path(current_dir).resolve())
+    if is_fresh(entry := assets_dirs.get(key)):
+        return entry["dir"]
+
+    cache = load_cache(cache_path) if cache_path else {}
+    if not is_fresh(entry := cache.get(key)):
+        assets_dir, mtimes = scan_assets_dir(current_dir)
+        entry = cache[key] = dict(dir=assets_dir, mtimes=mtimes)
+        if cache_path:
+            save_cache(cache_path, cache)
+
+    assets_dirs[key] = entry
+    return entry["dir"]
+
+
+class AssetIndex:
+    """name -> src lookups of files under the assets dir
+
+    the folder is walked once, a file is found by its relative path (with or
+    without the leading "/"), its name or its stem, e.g. "/icons/ok.svg",
+    "icons/ok.svg", "ok.svg" and "ok" all give "/icons/ok.svg", the first
+    file in walk order with a wanted suffix when several match. the walk is
+    repeated when a folder mtime changed, checked at most every
+    check_interval seconds.
+    """
+
+    check_interval = 2.0
+
+    def __init__(self, root: str = "") -> None:
+        self.root = root or get_assets_root()
+        self.names = {}
+        self.fonts = {}
+        self.mtimes = None
+        self.checked = 0.0
+
+    def build(self) -> None:
+        names = {}
+        fonts = {}
+        mtimes = {}
+        for folder, dirs, files in os.walk(self.root):
+            dirs.sort()
+            mtimes[folder] = get_mtime(folder)
+            rel = Path(folder).relative_to(self.root).as_posix().strip(".")
+            for name in sorted(files):
+                src = f"/{rel}/{name}" if rel else f"/{name}"
+                stem, suffix = os.path.splitext(name)
+                # "ok" may stand for ok.png and ok.svg, the suffixes of find() pick one
+                for key in dict.fromkeys(k.lower() for k in (src, src[1:], name, stem)):
+                    names.setdefault(key, []).append(src)
+
+                if suffix.lower() in FONT_SUFFIXES:
+                    fonts.setdefault(stem, src)
+
+        self.names = names
+        self.fonts = fonts
+        self.mtimes = mtimes or {self.root: get_mtime(self.root)}
+        self.checked = time.monotonic()
+
+    def ensure(self) -> None:
+        if self.mtimes is None:
+            with lock:
+                if self.mtimes is None:
+                    self.build()
+
+        elif time.monotonic() - self.checked > self.check_interval:
+            self.checked = time.monotonic()
+            if not is_fresh(dict(mtimes=self.mtimes)):
+                self.refresh()
+
+    def refresh(self) -> None:
+        with lock:
+            self.build()
+
+    def find(self, name: str, suffixes: Any = None) -> str:
+        """src of name, "" if not found or its suffix is not in suffixes"""
+        if len(name) > 255 or "<" in name:
+            # inline svg markup or data
+            return ""
+
+        self.ensure()
+        for src in self.names.get(name.lower(), ()):
+            if not suffixes or os.path.splitext(src)[1].lower() in suffixes:
+                return src
+
+        return ""
+
+    def src(self, name: str, suffixes: Any = None) -> str:
+        """src of name, name itself if not found"""
+        return self.find(name, suffixes) or name
+
+    def svg(self, name: str) -> str:
+        return self.src(name, {".svg"})
+
+    def icon(self, name: str) -> str:
+        return self.src(name, ICON_SUFFIXES)
+
+    def font(self, name: str) -> str:
+        return self.src(name, FONT_SUFFIXES)
+
+    def path(self, src: str) -> str:
+        """file path of a src like "/icons/ok.svg" """
+        return os.path.join(self.root, src.lstrip("/"))
+
+    def font_map(self) -> dict:
+        """{font file stem: src} of all fonts"""
+        self.ensure()
+        return dict(self.fonts)
+
+
+def set_assets_root(root: str) -> None:
+    global assets_root
+    assets_root = root
+
+
+def get_assets_root() -> str:
+    if not assets_root:
+        set_assets_root(find_assets_dir())
+
+    return assets_root
+
+
+def get_asset_index(root: str = "") -> AssetIndex:
+    root = root or get_assets_root()
+    if (index := asset_indexes.get(root)) is None:
+        index = asset_indexes[root] = AssetIndex(root)
+
+    return index
+
+
+def encode_svg(data: bytes) -> tuple:
+    digest = hashlib.sha1(data).hexdigest()
+    with svg_lock:
+        if (blob := svg_blobs.get(digest)) is None:
+            blob = svg_blobs[digest] = base64.b64encode(data).decode("ascii")
+
+    return digest, blob
+
+
+def svg_base64(svg: str, root: str = "") -> str:
+    """cached base64 of an svg under the assets dir or inline markup, "" if unreadable
+
+    files are read once and again only when their mtime changes.
+    """
+    if svg.lstrip().startswith("<"):
+        return encode_svg(svg.encode("utf-8"))[1]
+
+    index = get_asset_index(root)
+    if not (src := index.find(svg, {".svg"})):
+        return ""
+
+    path = index.path(src)
+    mtime = get_mtime(path)
+    if (entry := svg_files.get(path)) and entry[0] == mtime:
+        return svg_blobs[entry[1]]
+
+    try:
+        data = Path(path).read_bytes()
+    except OSError:
+        return ""
+
+    digest, blob = encode_svg(data)
+    svg_files[path] = (mtime, digest)
+    return blob
+
+
+def preload_svgs(names: Any = None, root: str = "", background: bool = True) -> Any:
+    """read and encode svgs ahead of the first render, all svgs of the assets dir by default
+
+    returns the started thread when background is true.
+    """
+
+    def run() -> None:
+        index = get_asset_index(root)
+        index.ensure()
+        for name in names or sorted(
+            {src for srcs in index.names.values() for src in srcs if src.lower().endswith(".svg")}
+        ):
+            svg_base64(name, root)
+
+    if not background:
+        return run()
+
+    thread = threading.Thread(target=run, name="fletbox-svgs", daemon=True)
+    thread.start()
+    return thread
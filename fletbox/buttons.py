@@ -10,14 +10,16 @@ from . import events as fbe
 
 
 def button(text: str, func: Any, style_kw: dict = {}, **kwargs: Any) -> ft.OutlinedButton:
-    style_kw.setdefault("shape", fbdp.shape(2))
-    kwargs.setdefault("style", ft.ButtonStyle(**style_kw))
+    if "style" not in kwargs:
+        kwargs.update(style=fbdp.button_style(2, **style_kw))
+
     return ft.OutlinedButton(text, on_click=func, **kwargs)
 
 
 def top_button(text: str, data: str = "", func: Any = None, **kwargs: Any) -> ft.ElevatedButton:
-    style = ft.ButtonStyle(shape=fbdp.shape(), padding=5, text_style=fbdp.text_style())
-    kwargs.setdefault("style", style)
+    if "style" not in kwargs:
+        kwargs.update(style=fbdp.button_style(padding=5, text_style=fbdp.text_style()))
+
     return ft.ElevatedButton(text=text, data=data, on_click=func, **kwargs)
 
 
@@ -28,8 +30,9 @@ def segmented(segments: list = [], **kwargs: Any) -> ft.SegmentedButton:
     kwargs.setdefault("on_change", lambda e: print(e))
     selected = kwargs.get("selected") or []
     kwargs.update(selected=set(selected))
-    style = ft.ButtonStyle(shape=fbdp.shape(), padding=5)
-    kwargs.setdefault("style", style)
+    if "style" not in kwargs:
+        kwargs.update(style=fbdp.button_style(padding=5))
+
     return ft.SegmentedButton(segments=prepare_segments(segments), **kwargs)
 
 
@@ -159,7 +162,7 @@ class IconButton(ft.IconButton):
         self.tooltip = tooltip
         self.icon = fbdp.icon(icon)
         self.selected_icon = fbdp.icon(selected_icon)
-        self.style = ft.ButtonStyle(shape=fbdp.shape(0))
+        self.style = fbdp.button_style(0)
         [setattr(self, k, v) for k, v in kwargs.items()]
 
 
@@ -0,0 +1,436 @@
+#!/usr/bin/env python3
+# -*- coding=utf-8 -*-
+
+import codecs
+import io
+import logging
+import os
+import re
+import subprocess
+import threading
+import time
+from pathlib import Path
+from typing import Any
+
+import flet as ft
+
+
+class LogLine:
+    """one console line kept as plain data instead of a ft.Text control"""
+
+    __slots__ = ("value", "style", "spans")
+
+    def __init__(self, value: str, style: dict) -> None:
+        self.value = value
+        self.style = style
+        self.spans = []  # [(text, style)]
+
+    @property
+    def text(self) -> str:
+        return self.value + "".join(text for text, _ in self.spans)
+
+
+class LogView(ft.ListView):
+    """virtualized console for EchoHelper, use it as page.lv
+
+    lines are stored as LogLine, only the visible window plus overscan lines
+    are materialized as ft.Text controls, which are recycled while scrolling.
+    spacers above and below the window keep the scroll extent of all lines.
+    """
+
+    def __init__(
+        self, line_height: int = 20, overscan: int = 20, window_lines: int = 50, **kwargs: Any
+    ) -> None:
+        kwargs.setdefault("expand", True)
+        kwargs.setdefault("spacing", 0)
+        kwargs.setdefault("padding", 0)
+        kwargs.setdefault("on_scroll_interval", 50)
+        super().__init__(**kwargs)
+        self.line_height = line_height
+        self.overscan = overscan
+        self.window_lines = window_lines
+        self.lines = []
+        self.styles = {}
+        self.first = 0
+        self.follow = True
+        self.auto_scroll = True
+        self.top_spacer = ft.Container(height=0)
+        self.bottom_spacer = ft.Container(height=0)
+        self.pool = []
+        self.controls = [self.top_spacer, self.bottom_spacer]
+        self.on_scroll = self.scrolled
+        # render() runs on the echo consumer and on scroll handler threads
+        self.lock = threading.RLock()
+
+    def intern_style(self, style: dict) -> dict:
+        try:
+            key = tuple(sorted(style.items()))
+        except TypeError:
+            return style
+
+        return self.styles.setdefault(key, style)
+
+    def append_line(self, value: str, style: dict) -> LogLine:
+        line = LogLine(value, self.intern_style(style))
+        self.lines.append(line)
+        return line
+
+    def remove_lines(self, count: int) -> None:
+        with self.lock:
+            del self.lines[:count]
+            self.first = max(0, self.first - count)
+
+    def clear_lines(self) -> None:
+        with self.lock:
+            self.lines.clear()
+            self.first = 0
+            self.follow = True
+
+    def bind(self, wgt: ft.Text, line: LogLine) -> None:
+        wgt.value = line.value
+        if wgt.data is not line.style:
+            # reset attributes left over from the previous line
+            for k in wgt.data or {}:
+                if k not in line.style:
+                    setattr(wgt, k, None)
+
+            for k, v in line.style.items():
+                setattr(wgt, k, v)
+
+            wgt.data = line.style
+
+        if line.spans or wgt.spans:
+            wgt.spans = [ft.TextSpan(text, ft.TextStyle(**style)) for text, style in line.spans]
+
+    def render(self) -> None:
+        with self.lock:
+            total = len(self.lines)
+            size = min(total, self.window_lines + 2 * self.overscan)
+            if self.follow:
+                self.first = total - size
+
+            first = self.first = max(0, min(self.first, total - size))
+            while len(self.pool) < size:
+                self.pool.append(ft.Text(height=self.line_height, no_wrap=True))
+
+            for wgt, line in zip(self.pool, self.lines[first : first + size]):
+                self.bind(wgt, line)
+
+            self.top_spacer.height = first * self.line_height
+            self.bottom_spacer.height = (total - first - size) * self.line_height
+            self.controls = [self.top_spacer] + self.pool[:size] + [self.bottom_spacer]
+
+    def scrolled(self, e: ft.OnScrollEvent) -> None:
+        if e.viewport_dimension:
+            self.window_lines = int(e.viewport_dimension // self.line_height) + 1
+
+        follow = e.pixels >= e.max_scroll_extent - self.line_height
+        first = max(0, int(e.pixels // self.line_height) - self.overscan)
+        with self.lock:
+            # re-bind only when the window moved far enough into the overscan area
+            if follow != self.follow or abs(first - self.first) * 2 >= self.overscan:
+                self.follow = self.auto_scroll = follow
+                self.first = first
+                self.render()
+                self.update()
+
+    def scroll_to_line(self, index: int, **kwargs: Any) -> None:
+        with self.lock:
+            self.follow = self.auto_scroll = False
+            self.first = index - self.overscan
+            self.render()
+
+        self.scroll_to(offset=index * self.line_height, **kwargs)
+
+
+class EchoStream:
+    """feed a subprocess pipe, a file object or a (growing) file into EchoHelper
+
+    data is read in chunks and decoded incrementally, so multi-byte characters
+    split across chunks are kept intact. each echo() gets a block of complete
+    lines instead of one call per line. reading pauses while the helper has
+    more than max_pending blocks queued or max_rate lines/s is reached, which
+    in turn blocks the child process once the pipe buffer is full.
+    """
+
+    def __init__(
+        self,
+        helper: Any,
+        source: Any,
+        follow: bool = False,
+        seek_end: bool = False,
+        chunk_size: int = 64 * 1024,
+        max_rate: float = 0,
+        max_pending: int = 8,
+        encoding: str = "utf-8",
+        poll_interval: float = 0.5,
+        **kwargs: Any,
+    ) -> None:
+        self.helper = helper
+        self.source = source
+        self.follow = follow
+        self.seek_end = seek_end
+        self.chunk_size = chunk_size
+        self.max_rate = max_rate
+        self.max_pending = max_pending
+        self.encoding = encoding
+        self.poll_interval = poll_interval
+        self.echo_kw = kwargs
+        self.stopped = threading.Event()
+        self.thread = None
+        self.error = None  # exception which stopped the reader thread
+        self.counters = dict(bytes=0, lines=0, blocks=0)
+
+    def start(self) -> "EchoStream":
+        self.thread = threading.Thread(target=self.run, daemon=True)
+        self.thread.start()
+        return self
+
+    def stop(self) -> None:
+        self.stopped.set()
+
+    def join(self, timeout: Any = None) -> None:
+        if self.thread:
+            self.thread.join(timeout)
+
+    def open(self) -> tuple:
+        """return (binary file object, owned)"""
+        if isinstance(self.source, subprocess.Popen):
+            # Popen(..., text=True) gives a text wrapper
+            return getattr(self.source.stdout, "buffer", self.source.stdout), False
+
+        if isinstance(self.source, (str, Path)):
+            fp = open(self.source, "rb")
+            if self.seek_end:
+                fp.seek(0, io.SEEK_END)
+
+            return fp, True
+
+        return getattr(self.source, "buffer", self.source), False
+
+    def read(self, fp: Any) -> bytes:
+        # read1() returns what is available instead of waiting for a full chunk
+        if hasattr(fp, "read1"):
+            return fp.read1(self.chunk_size)
+
+        return fp.read(self.chunk_size)
+
+    def is_truncated(self, fp: Any) -> bool:
+        try:
+            return os.fstat(fp.fileno()).st_size < fp.tell()
+        except (OSError, ValueError):
+            return False
+
+    def wait(self, lines: int, started: float) -> None:
+        if self.max_rate:
+            self.stopped.wait(max(0, lines / self.max_rate - (time.monotonic() - started)))
+
+        while self.helper.queue.qsize() > self.max_pending and not self.stopped.wait(0.01):
+            pass
+
+    def emit(self, block: str) -> None:
+        started = time.monotonic()
+        lines = block.count("\n") or 1
+        # newlines are kept as read: a block of only "\n" is a blank line or ends
+        # the unfinished row, a block without one is continued by the next block
+        self.helper.echo(block, nl=False, **self.echo_kw)
+
+        self.counters["lines"] += lines
+        self.counters["blocks"] += 1
+        self.wait(lines, started)
+
+    def run(self) -> None:
+        try:
+            self.read_all()
+        except Exception as e:
+            self.error = e
+            logging.exception(f"echo stream of {self.source!r} failed")
+
+    def read_all(self) -> None:
+        fp, owned = self.open()
+        decoder = codecs.getincrementaldecoder(self.encoding)(errors="replace")
+        rest = ""
+        try:
+            while not self.stopped.is_set():
+                chunk = self.read(fp)
+                if not chunk:
+                    if not self.follow or isinstance(self.source, subprocess.Popen):
+                        break
+
+                    if self.is_truncated(fp):
+                        fp.seek(0)
+                        decoder.reset()
+
+                    self.stopped.wait(self.poll_interval)
+                    continue
+
+                self.counters["bytes"] += len(chunk)
+                text = rest + decoder.decode(chunk)
+                # keep the unfinished line for the next chunk unless it grows too long
+                end = text.rfind("\n") + 1
+                if not end and len(text) < self.chunk_size:
+                    rest = text
+                    continue
+
+                end = end or len(text)
+                rest = text[end:]
+                self.emit(text[:end])
+
+            if tail := rest + decoder.decode(b"", final=True):
+                self.emit(tail)
+        finally:
+            if owned:
+                fp.close()
+
+
+class LineIndex:
+    """searchable copy of the console text for EchoHelper
+
+    lines are numbered from the first line ever added, so numbers stay valid
+    after old lines are evicted. lines are grouped into blocks of block_size,
+    each block is joined into one string once and cached, a search only scans
+    the lines of blocks which match as a whole.
+    """
+
+    block_size = 256
+
+    def __init__(self) -> None:
+        self.base = 0
+        self.texts = []
+        self.levels = []
+        self.colors = []
+        self.handles = []
+        self.blocks = {}
+        self.last = None
+
+    @property
+    def end(self) -> int:
+        return self.base + len(self.texts)
+
+    def add(self, text: str, handle: Any, level: str = "", color: str = "") -> int:
+        self.texts.append(text)
+        self.levels.append(level)
+        self.colors.append(color)
+        self.handles.append(handle)
+        self.invalidate((self.end - 1) // self.block_size)
+        return self.end - 1
+
+    def extend_last(self, text: str) -> None:
+        if self.texts:
+            self.texts[-1] += text
+            self.invalidate((self.end - 1) // self.block_size)
+
+    def remove(self, count: int) -> None:
+        for items in (self.texts, self.levels, self.colors, self.handles):
+            del items[:count]
+
+        self.base += count
+        first_block = self.base // self.block_size
+        for key in [key for key in self.blocks if key[0] <= first_block]:
+            del self.blocks[key]
+
+    def clear(self) -> None:
+        self.remove(len(self.texts))
+        self.last = None
+
+    def handle(self, line_no: int) -> Any:
+        if self.base <= line_no < self.end:
+            return self.handles[line_no - self.base]
+
+    def text(self, line_no: int) -> str:
+        if self.base <= line_no < self.end:
+            return self.texts[line_no - self.base]
+
+        return ""
+
+    def block(self, no: int, folded: bool = False) -> str:
+        if (text := self.blocks.get((no, folded))) is None:
+            if folded:
+                text = self.block(no).lower()
+            else:
+                start = max(no * self.block_size, self.base) - self.base
+                text = "\n".join(self.texts[start : (no + 1) * self.block_size - self.base])
+
+            self.blocks[(no, folded)] = text
+
+        return text
+
+    def invalidate(self, no: int) -> None:
+        self.blocks.pop((no, False), None)
+        self.blocks.pop((no, True), None)
+
+    def get_matcher(self, query: str, regex: bool = False, ignore_case: bool = True) -> tuple:
+        """return (folded, test, block test), plain queries use str `in` which is much faster than re
+
+        the block test must match a block whenever one of its lines matches,
+        it is None when no such test exists and every line is checked.
+        """
+        if regex:
+            # ^ and $ match at each line of a block, \A and \Z only at the block ends
+            flags = re.MULTILINE | (re.IGNORECASE if ignore_case else 0)
+            test = re.compile(query, flags).search
+            return False, test, None if "\\A" in query or "\\Z" in query else test
+
+        if ignore_case:
+            query = query.lower()
+
+        def test(text: str) -> bool:
+            return query in text
+
+        return ignore_case, test, test
+
+    def scan(self, matcher: tuple, start: int, level: str = "", color: str = "") -> list:
+        hits = []
+        folded, _, block_test = matcher
+        start = max(start, self.base)
+        for no in range(start // self.block_size, (self.end - 1) // self.block_size + 1):
+            if block_test and not block_test(self.block(no, folded)):
+                continue
+
+            first = max(start, no * self.block_size)
+            last = min(self.end, (no + 1) * self.block_size)
+            hits.extend(n for n in range(first, last) if self.is_match(n, matcher, level, color))
+
+        return hits
+
+    def is_match(self, line_no: int, matcher: tuple, level: str = "", color: str = "") -> bool:
+        i = line_no - self.base
+        if level and self.levels[i] != level:
+            return False
+
+        if color and self.colors[i] != color:
+            return False
+
+        folded, test, _ = matcher
+        return bool(test(self.texts[i].lower() if folded else self.texts[i]))
+
+    def search(
+        self, query: str = "", regex: bool = False, ignore_case: bool = True, level: str = "", color: str = ""
+    ) -> list:
+        """return line numbers matching query (substring or regex), level and color
+
+        when a plain query extends the previous one, only previous hits and
+        lines added since then are checked again (search as you type).
+        """
+        matcher = self.get_matcher(query, regex, ignore_case)
+        key = (regex, ignore_case, level, color)
+        folded = query.lower() if ignore_case else query
+        # re-checking previous hits one by one only pays off when they are few
+        if (
+            self.last
+            and self.last[0] == key
+            and not regex
+            and self.last[1] in folded
+            and len(self.last[2]) * 8 < self.end - self.base
+        ):
+            _, _, hits, searched = self.last
+            hits = [
+                n for n in hits if self.base <= n < searched - 1 and self.is_match(n, matcher, level, color)
+            ]
+            # the last line searched may have got more spans since then
+            hits += self.scan(matcher, searched - 1, level, color)
+        else:
+            hits = self.scan(matcher, self.base, level, color)
+
+        self.last = (key, folded, hits, self.end)
+        return hits
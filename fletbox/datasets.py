@@ -0,0 +1,289 @@
+#!/usr/bin/env python3
+# -*- coding=utf-8 -*-
+
+import csv
+import json
+import mmap
+import os
+import threading
+from array import array
+from collections.abc import Sequence
+from pathlib import Path
+from typing import Any
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+
+class ColumnStore(Sequence):
+    """column oriented rows for tables.PagedTable
+
+    int/float columns are kept in typed arrays (numpy arrays when numpy is
+    installed), other columns in lists. sort and filter only build an index
+    of visible rows, the column data is never copied or reordered. the sort
+    permutation of each column is computed once and cached.
+    it acts as a read-only sequence of rows: len(store), store[i], store[a:b]
+    """
+
+    def __init__(self, columns: list, rows: Any = ()) -> None:
+        self.names = list(columns)
+        values = [[] for _ in self.names]
+        for row in rows:
+            for buf, v in zip(values, row):
+                buf.append(v)
+
+        self.size = len(values[0]) if values else 0
+        self.columns = [self.pack(v) for v in values]
+        self.orders = {}
+        self.sort_index = None
+        self.ascending = True
+        self.mask = None
+        self.view = None
+
+    @staticmethod
+    def pack(values: list) -> Any:
+        if values and all(type(v) is int for v in values):
+            typecode = "q"
+        elif values and all(type(v) in (int, float) for v in values):
+            typecode = "d"
+        else:
+            return values
+
+        try:
+            return np.array(values, dtype=typecode) if np else array(typecode, values)
+        except OverflowError:
+            return values
+
+    def is_numpy(self, col: Any) -> bool:
+        return np is not None and isinstance(col, np.ndarray)
+
+    def column_index(self, col: Any) -> int:
+        return col if isinstance(col, int) else self.names.index(col)
+
+    def get_order(self, index: int) -> Any:
+        if (order := self.orders.get(index)) is None:
+            col = self.columns[index]
+            if self.is_numpy(col):
+                order = np.argsort(col, kind="stable")
+            else:
+                try:
+                    order = sorted(range(self.size), key=col.__getitem__)
+                except TypeError:
+                    # mixed types, e.g. str and None
+                    order = sorted(range(self.size), key=lambda i: (type(col[i]).__name__, f"{col[i]}"))
+
+                order = np.array(order) if np else array("q", order)
+
+            self.orders[index] = order
+
+        return order
+
+    def refresh_view(self) -> None:
+        order = None if self.sort_index is None else self.get_order(self.sort_index)
+        if order is not None and not self.ascending:
+            order = order[::-1]
+
+        if self.mask is None:
+            self.view = order
+        elif np:
+            order = np.arange(self.size) if order is None else order
+            self.view = order[self.mask[order]]
+        else:
+            order = range(self.size) if order is None else order
+            self.view = array("q", (i for i in order if self.mask[i]))
+
+    def sort(self, col: Any = None, ascending: bool = True) -> None:
+        """sort by a column index or name, None restores the original order"""
+        self.sort_index = None if col is None else self.column_index(col)
+        self.ascending = ascending
+        self.refresh_view()
+
+    def filter(self, mask: Any = None) -> None:
+        """show rows whose mask value is true, None shows all rows"""
+        if mask is not None:
+            mask = np.asarray(mask, dtype=bool) if np else bytearray(map(bool, mask))
+
+        self.mask = mask
+        self.refresh_view()
+
+    def filter_by(self, col: Any, func: Any) -> None:
+        """show rows for which func(value) is true"""
+        self.filter([func(v) for v in self.columns[self.column_index(col)]])
+
+    def take(self, col: Any, indexes: Any) -> list:
+        if self.is_numpy(col):
+            return col[indexes].tolist()
+
+        return [col[i] for i in indexes]
+
+    def __len__(self) -> int:
+        return self.size if self.view is None else len(self.view)
+
+    def __getitem__(self, key: Any) -> Any:
+        if isinstance(key, slice):
+            indexes = range(self.size)[key] if self.view is None else self.view[key]
+            if np:
+                indexes = np.asarray(indexes, dtype=np.int64)
+
+            return [list(row) for row in zip(*(self.take(col, indexes) for col in self.columns))]
+
+        index = range(self.size)[key] if self.view is None else int(self.view[key])
+        return [self.take(col, [index])[0] for col in self.columns]
+
+
+class FileRows:
+    """rows of a large CSV or JSONL file for tables.PagedTable
+
+    the file is memory-mapped and a byte offset of every row start is indexed
+    chunk by chunk, in a background thread and on demand as pages are read,
+    so opening does not wait for the whole file. only the requested rows are
+    decoded. use it as PagedTable(rows.columns, rows, total=rows.count).
+    csv rows with newlines inside quoted fields are not supported.
+    """
+
+    chunk_size = 16 * 1024 * 1024
+
+    def __init__(
+        self,
+        path: str,
+        kind: str = "",
+        encoding: str = "utf-8-sig",
+        header: bool = True,
+        columns: Any = None,
+        background: bool = True,
+        **kwargs: Any,
+    ) -> None:
+        suffix = Path(path).suffix.lower()
+        self.kind = kind or ("jsonl" if suffix in (".jsonl", ".ndjson") else "csv")
+        self.encoding = encoding
+        self.csv_kw = kwargs
+        self.path = path
+        self.background = background
+        self.lock = threading.Lock()
+        self.open_file()
+        self.first = 0
+        self.columns = columns
+        if self.kind == "csv" and header:
+            self.first = 1
+            self.columns = columns or self.decode(0)
+        elif self.columns is None:
+            if isinstance(row := json.loads(self.line(0) or "null"), dict):
+                self.columns = list(row)
+
+        self.start_indexing()
+
+    def open_file(self) -> None:
+        size = getattr(self, "size", None)
+        self.fp = open(self.path, "rb")
+        self.size = os.fstat(self.fp.fileno()).st_size
+        self.data = mmap.mmap(self.fp.fileno(), 0, access=mmap.ACCESS_READ) if self.size else b""
+        self.closed = False
+        if self.size == size:
+            # reopened and unchanged, the index is still valid
+            return
+
+        # offsets[i] is the start of row i, the last item is the end of the last indexed row
+        self.offsets = array("q", [0])
+        self.scanned = 0
+        self.done = not self.size
+
+    def start_indexing(self) -> None:
+        if self.background and not self.done:
+            threading.Thread(target=self.index_all, daemon=True).start()
+
+    def reopen(self) -> None:
+        """open the file again after close(), e.g. a table added back to the page"""
+        with self.lock:
+            if not self.closed:
+                return
+
+            self.open_file()
+
+        self.start_indexing()
+
+    def scan(self) -> bool:
+        """index the next chunk, return False once the whole file is indexed"""
+        with self.lock:
+            if self.done or self.closed:
+                return False
+
+            start = self.scanned
+            end = min(self.size, start + self.chunk_size)
+            if np:
+                chunk = np.frombuffer(self.data, dtype=np.uint8, count=end - start, offset=start)
+                self.offsets.frombytes((np.flatnonzero(chunk == 10) + (start + 1)).astype(np.int64).tobytes())
+            else:
+                pos = self.data.find(b"\n", start, end)
+                while pos >= 0:
+                    self.offsets.append(pos + 1)
+                    pos = self.data.find(b"\n", pos + 1, end)
+
+            self.scanned = end
+            if end == self.size:
+                if self.offsets[-1] < self.size:
+                    # last row without a trailing newline
+                    self.offsets.append(self.size)
+
+                self.done = True
+
+            return not self.done
+
+    def index_all(self) -> None:
+        while self.scan():
+            pass
+
+    def row_count(self, ensure: int = 0) -> int:
+        """number of indexed lines, index at least ensure lines if possible"""
+        while len(self.offsets) - 1 < ensure and self.scan():
+            pass
+
+        return len(self.offsets) - 1
+
+    def count(self) -> Any:
+        """number of rows, None until the file is fully indexed"""
+        if self.done:
+            return max(0, self.row_count() - self.first)
+
+    def line(self, index: int) -> str:
+        if self.closed:
+            self.reopen()
+
+        if self.row_count(index + 1) <= index:
+            return ""
+
+        start, end = self.offsets[index], self.offsets[index + 1]
+        return self.data[start:end].decode(self.encoding, errors="replace").rstrip("\r\n")
+
+    def decode(self, index: int) -> list:
+        if not (text := self.line(index)):
+            return []
+
+        if self.kind == "csv":
+            return next(csv.reader([text], **self.csv_kw), [])
+
+        row = json.loads(text)
+        if isinstance(row, dict):
+            return [row.get(c) for c in self.columns or row]
+
+        return row if isinstance(row, list) else [row]
+
+    def fetch(self, offset: int, limit: int) -> list:
+        start = offset + self.first
+        end = min(self.row_count(start + limit), start + limit)
+        return [self.decode(i) for i in range(start, end)]
+
+    __call__ = fetch
+
+    def close(self) -> None:
+        """free the file handle and mapping, they are opened again on the next read"""
+        with self.lock:
+            if self.closed:
+                return
+
+            self.closed = True
+            if self.size:
+                self.data.close()
+
+            self.fp.close()
@@ -7,6 +7,7 @@ import flet as ft
 
 from . import buttons as fbb
 from . import displays as fbdp
+from . import helpers as fbh
 from . import inputs as fbi
 
 
@@ -28,7 +29,7 @@ def get_dialog(
 
     align = kwargs.get("align", ft.MainAxisAlignment.END)
     if icon:
-        kw.update(icon=ft.Icon(getattr(ft.Icons, icon.upper()), **icon_kw))
+        kw.update(icon=fbdp.get_icon_content(icon, **icon_kw))
 
     return ft.AlertDialog(
         modal=kwargs.get("modal", True),
@@ -65,7 +66,8 @@ def warning(title: str, page: ft.Page, **kwargs: Any) -> None:
     kwargs.update(buttons=buttons)
     dlg = get_dialog(title, **kwargs)
     page.open(dlg)
-    page.update()
+    # page.open() sends the dialog, this sends other pending changes
+    fbh.request_update(page)
     return dlg
 
 
@@ -85,7 +87,8 @@ def confirm(title: str, page: ft.Page, **kwargs: Any) -> None:
     kwargs.update(buttons=buttons)
     dlg = get_dialog(title, **kwargs)
     page.open(dlg)
-    page.update()
+    # page.open() sends the dialog, this sends other pending changes
+    fbh.request_update(page)
     return dlg
 
 
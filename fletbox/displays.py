@@ -1,21 +1,101 @@
 #!/usr/bin/env python3
 # -*- coding=utf-8 -*-
 
+import threading
+from collections import OrderedDict
 from typing import Any
 
 import flet as ft
 
+from . import assets as fba
 from . import buttons as fbb
 from . import events as fbe
 from . import helpers as fbh
 
 
-def svg_icon(svg: str, **kwargs: Any) -> Any:
+SCALARS = {str, int, float, bool, type(None)}
+
+
+class InternCache:
+    """bounded LRU of shapes, text styles and other leaf values, keyed by arguments
+
+    the same arguments give the same object, shared by all controls using
+    it. only for values flet never writes to: controls update their own
+    styles in place (e.g. ButtonStyle.color of an ElevatedButton), so those
+    are created per control. arguments which cannot be hashed bypass the cache.
+    """
+
+    def __init__(self, max_size: int = 512) -> None:
+        self.max_size = max_size
+        self.items = OrderedDict()
+        self.lock = threading.Lock()
+        self.counters = dict(hits=0, misses=0)
+
+    def freeze(self, value: Any) -> Any:
+        if type(value) in SCALARS:
+            return value
+
+        if isinstance(value, dict):
+            return ("dict", tuple(sorted((k, self.freeze(v)) for k, v in value.items())))
+
+        if isinstance(value, (list, tuple)):
+            return (type(value).__name__, tuple(self.freeze(v) for v in value))
+
+        hash(value)
+        return value
+
+    def get(self, factory: Any, **kwargs: Any) -> Any:
+        try:
+            key = (factory, *((k, self.freeze(v)) for k, v in sorted(kwargs.items())))
+        except TypeError:
+            return factory(**kwargs)
+
+        if (value := self.items.get(key)) is not None:
+            # dict operations are atomic, no lock needed for hits
+            try:
+                self.items.move_to_end(key)
+            except KeyError:
+                pass
+
+            self.counters["hits"] += 1
+            return value
+
+        value = factory(**kwargs)
+        with self.lock:
+            self.counters["misses"] += 1
+            if (cached := self.items.get(key)) is not None:
+                return cached
+
+            self.items[key] = value
+            if len(self.items) > self.max_size:
+                self.items.popitem(last=False)
+
+        return value
+
+
+interned = InternCache()
+ICONS = {}  # lower-case name: ft.Icons member
+
+
+def lookup_icon(icon: str) -> Any:
+    """ft.Icons member of a name like "check" or "CHECK" """
+    if not ICONS:
+        ICONS.update((name.lower(), member) for name, member in ft.Icons.__members__.items())
+
+    return ICONS[icon.strip().lower()]
+
+
+def svg_icon(svg: str, inline: bool = False, **kwargs: Any) -> Any:
+    """inline sends the cached svg content (src_base64) instead of its url"""
     size = kwargs.pop("size", 24)
     kwargs.setdefault("width", size)
     kwargs.setdefault("height", size)
     # kwargs.setdefault("fit", ft.ImageFit.CONTAIN)
-    return ft.Image(src=svg, **kwargs)
+    if inline and (data := fba.svg_base64(svg)):
+        return ft.Image(src_base64=data, **kwargs)
+
+    # "ok" or "ok.svg" resolves to e.g. "/icons/ok.svg" under the assets dir
+    return ft.Image(src=fba.get_asset_index().svg(svg), **kwargs)
 
 
 def markdown(text: str, **kwargs: Any) -> ft.Markdown:
@@ -56,11 +136,21 @@ def snack(page: ft.Page, text: str, **kwargs: Any) -> None:
 
 def text_style(size: int = 15, bold: bool = True) -> ft.TextStyle:
     kw = dict(weight=ft.FontWeight.BOLD) if bold else {}
-    return ft.TextStyle(size=size, **kw)
+    return interned.get(ft.TextStyle, size=size, **kw)
 
 
 def shape(radius: int = 5) -> ft.RoundedRectangleBorder:
-    return ft.RoundedRectangleBorder(radius=radius)
+    return interned.get(ft.RoundedRectangleBorder, radius=radius)
+
+
+def button_style(radius: int = 5, **kwargs: Any) -> ft.ButtonStyle:
+    """new ft.ButtonStyle for one control, shape defaults to the shared shape(radius)
+
+    buttons write color, bgcolor, elevation etc. into their style on update,
+    so a style must not be shared between buttons.
+    """
+    kwargs.setdefault("shape", shape(radius))
+    return ft.ButtonStyle(**kwargs)
 
 
 def expand_container(content: Any, expand: bool = True, **kwargs: Any) -> ft.Container:
@@ -95,7 +185,7 @@ def get_icon(icon: str) -> str:
 
 def get_icon_content(icon: Any, **kwargs: Any) -> ft.Icon:
     if isinstance(icon, str):
-        return ft.Icon(getattr(ft.Icons, icon.upper()), **kwargs)
+        return ft.Icon(lookup_icon(icon), **kwargs)
 
     return icon
 
@@ -130,7 +220,8 @@ class TitleBar(ft.Row):
         self.text_color = kwargs.get("text_color", "indigo")
 
     def refresh_maximize(self) -> None:
-        fbe.on_tap_max(self.page, wgt=self.max_wgt)
+        if self.max_wgt.selected != self.page.window.maximized:
+            fbe.on_tap_max(self.page, wgt=self.max_wgt)
 
     def click_top(self, e: Any):
         fbe.on_tap_top(self.page, e)
@@ -149,7 +240,8 @@ class TitleBar(ft.Row):
             self.refresh_maximize()
 
         controls = []
-        self.page.on_resized = on_resized
+        # resize events come in bursts while dragging
+        self.page.on_resized = fbe.debounce(on_resized, 0.2, max_wait=1.0)
         if self._icon:
             controls.append(ft.Container(svg_icon(self._icon, size=20), margin=ft.margin.only(left=5)))
 
@@ -1,12 +1,140 @@
 #!/usr/bin/env python3
 # -*- coding=utf-8 -*-
 
+import threading
+import time
 from typing import Any
 
 import flet as ft
 
 from . import helpers as fbh
 
+WINDOW_CHANGES = {"resize", "resized", "move", "moved", "maximize", "unmaximize", "restore"}
+
+
+class Debouncer:
+    """call func with the latest arguments once calls stop for wait seconds
+
+    max_wait forces a call during a long burst, leading calls at the start of
+    a burst too. calls only move a deadline, a single timer thread is
+    re-armed until the deadline is reached.
+    """
+
+    def __init__(self, func: Any, wait: float = 0.2, max_wait: float = 0, leading: bool = False) -> None:
+        self.func = func
+        self.wait = wait
+        self.max_wait = max_wait
+        self.leading = leading
+        self.lock = threading.Lock()
+        self.timer = None
+        self.pending = None
+        self.first = 0.0
+        self.deadline = 0.0
+        self.called = 0.0
+
+    def __call__(self, *args: Any, **kwargs: Any) -> None:
+        now = time.monotonic()
+        call_now = False
+        with self.lock:
+            if self.timer is None:
+                # a new burst, not right after a trailing call
+                self.first = now
+                call_now = self.leading and now - self.called >= self.wait
+
+            self.pending = None if call_now else (args, kwargs)
+            self.deadline = now + self.wait
+            if self.max_wait:
+                self.deadline = min(self.deadline, self.first + self.max_wait)
+
+            if self.timer is None:
+                self.start(self.deadline - now)
+
+            if call_now:
+                self.called = now
+
+        if call_now:
+            self.func(*args, **kwargs)
+
+    def start(self, delay: float) -> None:
+        self.timer = threading.Timer(max(0, delay), self.fire)
+        self.timer.daemon = True
+        self.timer.start()
+
+    def fire(self) -> None:
+        with self.lock:
+            if (delay := self.deadline - time.monotonic()) > 0:
+                self.start(delay)
+                return
+
+            self.timer = None
+            pending, self.pending = self.pending, None
+            if pending:
+                self.called = time.monotonic()
+
+        if pending:
+            self.func(*pending[0], **pending[1])
+
+    def cancel(self) -> None:
+        with self.lock:
+            if self.timer:
+                self.timer.cancel()
+
+            self.timer = self.pending = None
+
+    def flush(self) -> None:
+        """call now if a call is pending"""
+        with self.lock:
+            if self.timer:
+                self.timer.cancel()
+
+            self.timer = None
+            pending, self.pending = self.pending, None
+
+        if pending:
+            self.func(*pending[0], **pending[1])
+
+
+def debounce(func: Any, wait: float = 0.2, max_wait: float = 0) -> Debouncer:
+    return Debouncer(func, wait, max_wait)
+
+
+def throttle(func: Any, interval: float = 0.2) -> Debouncer:
+    """call at once, then at most once per interval with the latest arguments"""
+    return Debouncer(func, interval, interval, leading=True)
+
+
+def auto_save_window_ui(page: ft.Page, key: str = "win_pos", wait: float = 0.5) -> Debouncer:
+    """save window geometry once the window stops moving or resizing
+
+    only writes when helpers.save_window(page) differs from the last saved
+    value. call it after options.setup_events(), the pending save is flushed
+    at teardown.
+    """
+    last = fbh.load_window_ui(page, key)
+
+    def persist() -> None:
+        nonlocal last
+        if (settings := fbh.save_window(page)) and settings != last:
+            fbh.get_storage(page).set_key(settings, key)
+            last = settings
+
+    saver = debounce(persist, wait)
+    handler = page.window.on_event
+
+    def window_event(e: Any) -> None:
+        if e.data in WINDOW_CHANGES:
+            saver()
+
+        if handler:
+            handler(e)
+
+    page.window.on_event = window_event
+    if not hasattr(page, "teardowns"):
+        page.teardowns = []
+
+    page.teardowns.append(dict(func=saver.flush, name="window_ui"))
+    return saver
+
 
 def on_tap_mode(page: ft.Page, e: Any = None, refresh: bool = True, wgt: Any = None) -> None:
     if e:
@@ -24,7 +152,8 @@ def on_tap_mode(page: ft.Page, e: Any = None, refresh: bool = True, wgt: Any = N
     tooltip = "退出深色模式" if fbh.is_dark_mode(page) else "进入深色模式"
     control.tooltip = tooltip
     if refresh:
-        page.update()
+        # without e, the caller changed page.theme_mode, which needs a page update too
+        fbh.request_update(page)
 
 
 def on_tap_top(page: ft.Page, e: Any) -> None:
@@ -32,12 +161,12 @@ def on_tap_top(page: ft.Page, e: Any) -> None:
     page.window.always_on_top = not page.window.always_on_top
     tooltip = "取消窗口置顶" if page.window.always_on_top else "窗口置顶"
     e.control.tooltip = tooltip
-    page.update()
+    fbh.request_update(page)
 
 
 def on_tap_min(page: ft.Page) -> None:
     page.window.minimized = True
-    page.update()
+    fbh.request_update(page)
 
 
 def on_tap_max(page: ft.Page, e: Any = None, wgt: Any = None) -> None:
@@ -49,7 +178,11 @@ def on_tap_max(page: ft.Page, e: Any = None, wgt: Any = None) -> None:
 
     tooltip = "恢复窗口" if page.window.maximized else "最大化"
     control.tooltip = tooltip
-    page.update()
+    if e:
+        fbh.request_update(page)
+    else:
+        # the window was resized elsewhere, only the button changes
+        fbh.request_update(page, control)
 
 
 def on_tap_close(page: ft.Page) -> None:
@@ -1,14 +1,25 @@
 #!/usr/bin/env python3
 # -*- coding=utf-8 -*-
 
+import asyncio
+import contextlib
 import logging
+import queue
 import sys
+import threading
+import time
+from collections import deque
 from datetime import datetime
 from pathlib import Path
 from typing import Any
 
 import flet as ft
-from flet.security import decrypt, encrypt
+
+from . import assets as fba
+from . import startup as fbst
+
+fbc = fbst.lazy_import(".consoles")
+fbs = fbst.lazy_import(".storages")
 
 
 def is_dark_mode(page: ft.Page) -> bool:
@@ -25,12 +36,13 @@ def clear_splash() -> None:
 
 
 def encrypt_text(text: str, secret_key: str) -> str:
-    return encrypt(text, secret_key)
+    # same format as flet.security.encrypt, the derived key is cached per session
+    return fbs.get_crypto_session(secret_key).encrypt(text)
 
 
 def decrypt_text(hashed_text: str, secret_key: str) -> str:
     try:
-        return decrypt(hashed_text, secret_key)
+        return fbs.get_crypto_session(secret_key).decrypt(hashed_text)
     except Exception:
         return hashed_text
 
@@ -88,14 +100,118 @@ def restore_window(page: ft.Page, settings: Any) -> None:
     page.update()
 
 
+class UpdateBatch:
+    """pending updates of a page, see batch_updates() and request_update()"""
+
+    lock = threading.Lock()
+
+    def __init__(self, page: ft.Page) -> None:
+        self.page = page
+        self.depth = 0
+        self.full = False
+        self.controls = []
+        self.scheduled = False
+        self.counters = dict(requests=0, updates=0)
+
+    def mark(self, controls: tuple) -> None:
+        with self.lock:
+            self.counters["requests"] += 1
+            if not controls:
+                self.full = True
+
+            for control in controls:
+                if not any(c is control for c in self.controls):
+                    self.controls.append(control)
+
+    def schedule(self) -> None:
+        """flush once the current event loop tick is done"""
+        with self.lock:
+            if self.scheduled:
+                return
+
+            self.scheduled = True
+
+        self.page.loop.call_soon(self.flush)
+
+    def flush(self) -> None:
+        with self.lock:
+            full, controls = self.full, self.controls
+            self.full, self.controls, self.scheduled = False, [], False
+            if full or controls:
+                self.counters["updates"] += 1
+
+        # a page update includes changes of all its controls
+        if full:
+            self.page.update()
+        elif controls:
+            self.page.update(*controls)
+
+
+def get_update_batch(page: ft.Page) -> UpdateBatch:
+    with UpdateBatch.lock:
+        if not (batch := getattr(page, "update_batch", None)):
+            batch = page.update_batch = UpdateBatch(page)
+
+    return batch
+
+
+@contextlib.contextmanager
+def batch_updates(page: ft.Page) -> Any:
+    """request_update() calls in the block are sent as one update at the end"""
+    batch = get_update_batch(page)
+    with batch.lock:
+        batch.depth += 1
+
+    try:
+        yield batch
+    finally:
+        # handlers of several threads may batch the same page
+        with batch.lock:
+            batch.depth -= 1
+            done = not batch.depth
+
+        if done:
+            batch.flush()
+
+
+def request_update(page: ft.Page, *controls: Any) -> None:
+    """update controls, or the page if none given
+
+    inside batch_updates(), or in async handlers running on the page event
+    loop, updates are merged and sent once at the end of the block or the
+    loop tick. sync handlers run in threads and update at once otherwise.
+    """
+    batch = get_update_batch(page)
+    batch.mark(controls)
+    if batch.depth:
+        return
+
+    if is_loop_thread(page):
+        batch.schedule()
+    else:
+        batch.flush()
+
+
+def is_loop_thread(page: ft.Page) -> bool:
+    try:
+        return asyncio.get_running_loop() is getattr(page, "loop", None)
+    except RuntimeError:
+        return False
+
+
+def get_storage(page: ft.Page) -> "BaseStorage":
+    if not (helper := getattr(page, "storage_helper", None)):
+        helper = page.storage_helper = BaseStorage(page)
+
+    return helper
+
+
 def save_window_ui(page: ft.Page, key: str = "win_pos") -> None:
-    helper = BaseStorage(page)
-    helper.set_key(save_window(page), key)
+    get_storage(page).set_key(save_window(page), key)
 
 
 def load_window_ui(page: ft.Page, key: str = "win_pos") -> dict:
-    helper = BaseStorage(page)
-    return helper.get_key(key) or {}
+    return get_storage(page).get_key(key) or {}
 
 
 def is_dist() -> bool:
@@ -110,17 +226,9 @@ def remember_control(page: ft.Page, name: str, control: Any) -> None:
         page.wgts[name] = control
 
 
-def get_assets_dir(current_dir: str = ".") -> str:
-    for fp in Path(current_dir).iterdir():
-        if fp.is_dir():
-            if fp.name == "assets":
-                return fp.name
-
-            for ffp in fp.iterdir():
-                if ffp.is_dir() and ffp.name == "assets":
-                    return str(ffp).replace("\\", "/")
-
-    return "assets"
+def get_assets_dir(current_dir: str = ".", cache_path: str = "") -> str:
+    # cached per folder, cache_path keeps the result between runs
+    return fba.find_assets_dir(current_dir, cache_path)
 
 
 def validate(wgt: Any, val: Any, error_kind: str = "error_text") -> bool:
@@ -148,6 +256,9 @@ class StorageHelper:
     __app_name__ = "flet"
     __app_org__ = "flet-dev"
     __app_client_key__ = "flet-dev-client"
+    page = None
+    backend = None
+    codec = None
 
     @property
     def app_client_key(self) -> str:
@@ -172,14 +283,85 @@ class StorageHelper:
         self.__app_client_key__ = page.__app_client_key__
         self.__secret_key__ = page.__secret_key__
 
+    @property
+    def storage(self) -> Any:
+        """self.backend, or the storage set up by options.setup_storage(), else page.client_storage"""
+        if self.backend:
+            return self.backend
+
+        page = self.page
+        return (
+            getattr(page, "storage_cache", None)
+            or getattr(page, "storage_backend", None)
+            or page.client_storage
+        )
+
     def get_client_key(self, key: str = "") -> str:
         return f"{self.app_org}.{self.app_name}.{key or self.app_client_key}"
 
+    @property
+    def value_codec(self) -> Any:
+        """self.codec or the storages.ValueCodec set up by options.setup_storage()"""
+        return self.codec or getattr(self.page, "storage_codec", None)
+
     def set_key(self, val: Any, key: str = "") -> None:
-        self.page.client_storage.set(self.get_client_key(key), val)
+        if self.value_codec:
+            self.set_many({key: val})
+        else:
+            self.storage.set(self.get_client_key(key), val)
 
     def get_key(self, key: str = "") -> Any:
-        return self.page.client_storage.get(self.get_client_key(key))
+        if self.value_codec:
+            return self.get_many([key])[key]
+
+        return self.storage.get(self.get_client_key(key))
+
+    @property
+    def namespace(self) -> str:
+        return f"{self.app_org}.{self.app_name}."
+
+    def get_many(self, keys: list) -> dict:
+        client_keys = {self.get_client_key(key): key for key in keys}
+        if codec := self.value_codec:
+            values = codec.read_many(self.storage, client_keys)
+        else:
+            values = fbs.get_many(self.storage, client_keys)
+
+        return {client_keys[k]: v for k, v in values.items()}
+
+    def set_many(self, items: dict) -> None:
+        items = {self.get_client_key(k): v for k, v in items.items()}
+        if codec := self.value_codec:
+            codec.write_many(self.storage, items)
+        else:
+            fbs.set_many(self.storage, items)
+
+    def delete_many(self, keys: list) -> None:
+        keys = [self.get_client_key(key) for key in keys]
+        if codec := self.value_codec:
+            codec.remove_many(self.storage, keys)
+        else:
+            fbs.remove_many(self.storage, keys)
+
+    def keys(self, prefix: str = "") -> list:
+        """keys under app_org.app_name, without the namespace"""
+        size = len(self.namespace)
+        keys = self.storage.get_keys(self.namespace + prefix)
+        if (codec := self.value_codec) and codec.chunk_size:
+            keys = [key for key in keys if not fbs.is_chunk_key(key)]
+
+        return [key[size:] for key in keys]
+
+    def items(self, prefix: str = "") -> dict:
+        return self.get_many(self.keys(prefix))
+
+    def clear_keys(self, prefix: str = "") -> None:
+        self.delete_many(self.keys(prefix))
+
+    def sync(self) -> None:
+        """write cached changes to client storage now"""
+        if cache := getattr(self.page, "storage_cache", None):
+            cache.sync()
 
     def encrypt(self, text: str) -> str:
         return encrypt_text(text, self.secret_key)
@@ -187,29 +369,205 @@ class StorageHelper:
     def decrypt(self, text: str) -> str:
         return decrypt_text(text, self.secret_key)
 
+    def encrypt_many(self, texts: list) -> list:
+        return fbs.get_crypto_session(self.secret_key).encrypt_many(texts)
+
+    def decrypt_many(self, texts: list, workers: int = 4) -> list:
+        return fbs.get_crypto_session(self.secret_key).decrypt_many(texts, workers)
+
 
 class BaseStorage(StorageHelper):
     def __init__(self, page: ft.Page) -> None:
         self.init_page(page)
 
 
+class LocalStorage(StorageHelper):
+    """StorageHelper on a local sqlite file in the user's config folder,
+    usable before ft.app() has a page, e.g. to read settings at startup"""
+
+    def __init__(self, app_org: str = "", app_name: str = "", secret_key: str = "", path: str = "") -> None:
+        if app_org:
+            self.__app_org__ = app_org
+
+        if app_name:
+            self.__app_name__ = app_name
+
+        if secret_key:
+            self.__secret_key__ = secret_key
+
+        path = path or fbs.get_config_dir(self.app_org, self.app_name) / "storage.db"
+        self.backend = fbs.get_sqlite_storage(path)
+
+
 class EchoHelper:
     page = None
     kept_line = ""
     last_wgt = None
     kept_wgt = None
-
-    def __init__(self, page: ft.Page) -> None:
+    max_fps = 0.0
+    max_batch = 500
+    consumer = None
+    generation = 0
+    index = None
+    max_lines = 0
+    max_bytes = 0
+    spill_path = ""
+    spilled = False
+    # evict only after the limit is exceeded by this ratio, keeps eviction amortized O(1)
+    retention_slack = 0.1
+
+    def __init__(
+        self,
+        page: ft.Page,
+        max_fps: float = 0,
+        max_batch: int = 500,
+        max_lines: int = 0,
+        max_bytes: int = 0,
+        spill_path: str = "",
+        searchable: bool = False,
+    ) -> None:
+        """max_fps > 0 enables coalescing mode: echo() only queues the text,
+        lines are written to page.lv and page.update() is called at most
+        max_fps times per second, or at once when max_batch lines are queued.
+
+        max_lines/max_bytes keep only the latest lines in page.lv, evicted
+        lines are appended to spill_path if given, the file is truncated on
+        the first spill of the helper and by clear_controls().
+
+        if page.lv is a consoles.LogView, lines are kept as plain data and
+        only the visible ones are rendered as controls.
+
+        searchable keeps a consoles.LineIndex of the text for search(),
+        echo(..., level="error") tags lines for filtering.
+        """
         self.page = page
+        self.max_fps = max_fps
+        self.max_batch = max_batch
+        self.max_lines = max_lines
+        self.max_bytes = max_bytes
+        self.spill_path = spill_path
+        self.lines = deque()
+        self.kept_bytes = 0
+        self.spill_fp = None
+        self.index = fbc.LineIndex() if searchable else None
+        self.queue = queue.SimpleQueue()
+        self.flush_lock = threading.Lock()
+        self.last_flush = 0.0
+        self.counters = dict(flushes=0, flushed=0)
+        if max_fps:
+            fbst.load_all()
+            self.consumer = threading.Thread(target=self.consume, daemon=True)
+            self.consumer.start()
 
     @property
     def lv(self) -> Any:
         return self.page.lv
 
+    @property
+    def stats(self) -> dict:
+        flushes, flushed = self.counters["flushes"], self.counters["flushed"]
+        pending = self.queue.qsize()
+        avg_batch = flushed / flushes if flushes else 0
+        return dict(self.counters, queued=flushed + pending, pending=pending, avg_batch=avg_batch)
+
+    @property
+    def is_virtual(self) -> bool:
+        return isinstance(self.lv, fbc.LogView)
+
+    @property
+    def has_retention(self) -> bool:
+        return bool(self.max_lines or self.max_bytes)
+
+    @staticmethod
+    def line_text(wgt: Any) -> str:
+        if isinstance(wgt, fbc.LogLine):
+            return wgt.text
+
+        return (wgt.value or "") + "".join(span.text or "" for span in wgt.spans or [])
+
     def clear_controls(self) -> None:
-        self.last_wgt = None
-        self.kept_wgt = None
-        self.lv.controls.clear()
+        with self.flush_lock:
+            self.generation += 1
+            self.last_wgt = None
+            self.kept_wgt = None
+            if self.has_retention:
+                self.lines.clear()
+                self.kept_bytes = 0
+
+            if self.index:
+                self.index.clear()
+
+            if self.spill_fp:
+                self.spill_fp.close()
+                self.spill_fp = None
+
+            self.spilled = False
+            if self.is_virtual:
+                self.lv.clear_lines()
+            else:
+                self.lv.controls.clear()
+
+    def is_over_limit(self, slack: float = 0) -> bool:
+        if self.max_lines and len(self.lines) > self.max_lines * (1 + slack):
+            return True
+
+        return bool(self.max_bytes and self.kept_bytes > self.max_bytes * (1 + slack))
+
+    def evict(self) -> None:
+        if not self.is_over_limit(self.retention_slack):
+            return
+
+        evicted = []
+        while self.lines and self.is_over_limit():
+            wgt, size = self.lines.popleft()
+            self.kept_bytes -= size
+            evicted.append(wgt)
+
+        # echo lines are appended in order, so evicted ones are at the head of lv.controls
+        if self.is_virtual:
+            self.lv.remove_lines(len(evicted))
+        else:
+            del self.lv.controls[: len(evicted)]
+
+        if self.index:
+            self.index.remove(len(evicted))
+
+        if self.last_wgt in evicted:
+            self.last_wgt = None
+
+        if self.kept_wgt in evicted:
+            self.kept_wgt = None
+
+        if self.spill_path:
+            self.spill(evicted)
+
+    def spill(self, wgts: list) -> None:
+        if not self.spill_fp:
+            # lines of earlier sessions or helpers are not part of this history
+            self.spill_fp = open(self.spill_path, "a" if self.spilled else "w", encoding="utf-8")
+            self.spilled = True
+
+        self.spill_fp.writelines(f"{self.line_text(wgt)}\n" for wgt in wgts)
+        self.spill_fp.flush()
+
+    def iter_history(self) -> Any:
+        """yield spilled lines first, then lines still in page.lv"""
+        if self.spilled and Path(self.spill_path).exists():
+            with open(self.spill_path, encoding="utf-8") as f:
+                for line in f:
+                    yield line.removesuffix("\n")
+
+        if self.has_retention:
+            wgts = (wgt for wgt, _ in self.lines)
+        else:
+            wgts = self.lv.lines if self.is_virtual else self.lv.controls
+
+        for wgt in wgts:
+            yield self.line_text(wgt)
+
+    def export(self, path: str) -> None:
+        with open(path, "w", encoding="utf-8") as f:
+            f.writelines(f"{line}\n" for line in self.iter_history())
 
     def append_lv_text(self, text: Any, **kwargs: Any) -> ft.Text:
         # wgt = ft.Text(f"{text}", **kwargs)
@@ -218,19 +576,184 @@ class EchoHelper:
 
         # display line by line due to scroll bar issue
         wgts = []
+        is_virtual = self.is_virtual
+        level = kwargs.pop("level", "")
         for line in f"{text or ' '}".splitlines(True):
             if bool(line):
-                wgt = ft.Text(line.removesuffix("\n"), **kwargs)
-                self.lv.controls.append(wgt)
+                line = line.removesuffix("\n")
+                if is_virtual:
+                    wgt = self.lv.append_line(line, kwargs)
+                else:
+                    wgt = ft.Text(line, **kwargs)
+                    self.lv.controls.append(wgt)
+
                 wgts.append(wgt)
+                if self.index:
+                    self.index.add(line, wgt, level, kwargs.get("color", ""))
+
+                if self.has_retention:
+                    size = len(line.encode("utf-8"))
+                    self.lines.append((wgt, size))
+                    self.kept_bytes += size
 
         return wgts[-1]
 
     def append_to_row(self, text: str, **kwargs: Any) -> None:
-        wgt = kwargs.pop("wgt", None)
-        (wgt or self.last_wgt).spans.append(ft.TextSpan(text, ft.TextStyle(**kwargs)))
+        wgt = kwargs.pop("wgt", None) or self.last_wgt
+        kwargs.pop("level", None)
+        if self.index:
+            self.index.extend_last(text)
+
+        if isinstance(wgt, fbc.LogLine):
+            wgt.spans.append((text, kwargs))
+        else:
+            wgt.spans.append(ft.TextSpan(text, ft.TextStyle(**kwargs)))
+
+        if self.has_retention and self.lines:
+            # spans are always appended to the latest line
+            wgt, size = self.lines[-1]
+            span_size = len(text.encode("utf-8"))
+            self.lines[-1] = (wgt, size + span_size)
+            self.kept_bytes += span_size
 
     def echo(self, text: Any, **kwargs: Any) -> None:
+        """safe to call from any thread, text is queued and applied to page.lv by a single consumer"""
+        if not f"{text}":
+            return
+
+        self.queue.put((self.generation, text, kwargs))
+        if not self.consumer:
+            self.drain()
+
+    async def aecho(self, text: Any, **kwargs: Any) -> None:
+        """echo() for async handlers, page.update() never runs on the event loop"""
+        if not f"{text}":
+            return
+
+        self.queue.put((self.generation, text, kwargs))
+        if not self.consumer:
+            await asyncio.to_thread(self.drain)
+
+    def drain(self) -> None:
+        # whoever gets flush_lock applies the items of all producers, others just return,
+        # the queue is checked again after release so no item is left behind
+        while not self.queue.empty() and self.flush_lock.acquire(blocking=False):
+            try:
+                items = []
+                while len(items) < self.max_batch and not self.queue.empty():
+                    item = self.queue.get_nowait()
+                    if item[0] is None:
+                        # marker left by a dead consumer
+                        item[1].set()
+                    else:
+                        items.append(item)
+
+                if items:
+                    self.apply(items)
+            finally:
+                self.flush_lock.release()
+
+    def consume(self) -> None:
+        interval = 1 / self.max_fps
+        while True:
+            items = [self.queue.get()]
+            deadline = self.last_flush + interval
+            # collect until the next allowed flush, a full batch or a marker (gen is None)
+            while items[-1][0] is not None and len(items) < self.max_batch:
+                try:
+                    items.append(self.queue.get(timeout=max(0, deadline - time.monotonic())))
+                except queue.Empty:
+                    break
+
+            marker = items.pop() if items[-1][0] is None else None
+            if items:
+                try:
+                    with self.flush_lock:
+                        self.apply(items)
+                except Exception:
+                    # e.g. page.update() of a disconnected session, keep serving markers
+                    logging.exception("echo flush failed")
+
+            if marker:
+                _, event, stop = marker
+                event.set()
+                if stop:
+                    return
+
+    def apply(self, items: list) -> None:
+        for gen, text, kwargs in items:
+            # skip lines queued before clear_controls()
+            if gen == self.generation:
+                self.write(text, **kwargs)
+
+        self.last_flush = time.monotonic()
+        self.counters["flushes"] += 1
+        self.counters["flushed"] += len(items)
+        if self.is_virtual:
+            self.lv.render()
+
+        self.page.update()
+
+    def wait_consumer(self, stop: bool = False) -> bool:
+        """queue a marker and wait for the consumer, False if it is gone"""
+        consumer = self.consumer
+        event = threading.Event()
+        self.queue.put((None, event, stop))
+        while not event.wait(0.5):
+            if not consumer.is_alive():
+                # echo() drains by itself from now on
+                self.consumer = None
+                return False
+
+        return True
+
+    def flush(self) -> None:
+        if self.consumer and threading.current_thread() is not self.consumer:
+            if self.wait_consumer():
+                return
+
+        self.drain()
+
+    def close(self) -> None:
+        if consumer := self.consumer:
+            if self.wait_consumer(stop=True):
+                consumer.join()
+
+            self.consumer = None
+
+        self.drain()
+        if self.spill_fp:
+            self.spill_fp.close()
+            self.spill_fp = None
+
+    def search(self, query: str = "", **kwargs: Any) -> list:
+        """line numbers matching query, see consoles.LineIndex.search()"""
+        if not self.index:
+            return []
+
+        with self.flush_lock:
+            return self.index.search(query, **kwargs)
+
+    def jump_to(self, line_no: int, **kwargs: Any) -> bool:
+        """scroll page.lv to a line number returned by search()"""
+        with self.flush_lock:
+            if not self.index or (wgt := self.index.handle(line_no)) is None:
+                return False
+
+            if self.is_virtual:
+                self.lv.scroll_to_line(line_no - self.index.base, **kwargs)
+            else:
+                wgt.key = wgt.key or f"echo-{line_no}"
+                self.lv.scroll_to(key=wgt.key, **kwargs)
+
+        return True
+
+    def stream(self, source: Any, **kwargs: Any) -> "fbc.EchoStream":
+        """echo a subprocess.Popen stdout, file path or file object in a background thread"""
+        return fbc.EchoStream(self, source, **kwargs).start()
+
+    def write(self, text: Any, **kwargs: Any) -> None:
+        """add text to page.lv without page.update()"""
         if not f"{text}":
             return
 
@@ -264,10 +787,10 @@ class EchoHelper:
                     self.last_wgt = self.append_lv_text("".join(lines[1:]), **kwargs)
 
             else:
-                last_wgt = self.append_lv_text(text, **kwargs)
-                self.last_wgt = None if new_line else last_wgt
+                self.last_wgt = self.append_lv_text(text, **kwargs)
 
-            if new_line:
+            if text.endswith("\n"):
+                # the row is complete, also for nl=False text ending with a newline
                 self.last_wgt = None
 
         else:
@@ -285,14 +808,114 @@ class EchoHelper:
 
             self.kept_line = lines[-1]
 
-        self.page.update()
+        if self.has_retention:
+            self.evict()
+
 
+def run_app(
+    func: Any,
+    log_level: int = logging.INFO,
+    log_fmt: str = "",
+    assets_cache: str = "",
+    startup_report: Any = None,
+    preload_svgs: Any = None,
+    **kwargs: Any,
+) -> None:
+    """startup_report logs the startup phases, on by default in fast start mode (see startup.py)
 
-def run_app(func: Any, log_level: int = logging.INFO, log_fmt: str = "", **kwargs: Any) -> None:
+    preload_svgs: svg names to read and encode in the background, True for all
+    """
+    fbst.mark("imports")
     if not is_dist():
         if not log_fmt:
             log_fmt = "%(levelname)s:%(asctime)s %(message)s"
 
         logging.basicConfig(level=log_level, format=log_fmt)
 
-    ft.app(func, assets_dir=get_assets_dir(), **kwargs)
+    assets_dir = get_assets_dir(cache_path=assets_cache)
+    fba.set_assets_root(assets_dir)
+    if preload_svgs:
+        fba.preload_svgs(None if preload_svgs is True else preload_svgs)
+
+    fbst.mark("assets")
+    if startup_report is None:
+        startup_report = fbst.enabled
+
+    ft.app(timed_app(func, startup_report), assets_dir=assets_dir, **kwargs)
+
+
+def timed_app(func: Any, report: bool = False) -> Any:
+    """time page setup and the first page.update of the first page"""
+
+    def finish(page: ft.Page) -> None:
+        if hasattr(page, "startup_report"):
+            return
+
+        page.startup_report = fbst.report()
+        if report:
+            fbst.log_report()
+
+        # the first frame is out, load deferred modules before threads need them
+        fbst.load_all()
+
+    pending = []
+
+    def restore(page: ft.Page) -> None:
+        # page.update may have been wrapped again meanwhile, e.g. by profiling.enable()
+        if pending and vars(page).get("update") is pending.pop():
+            del page.update
+
+    def start(page: ft.Page) -> bool:
+        if fbst.phases.get("connect") is not None:
+            # later sessions of a web app
+            return False
+
+        fbst.mark("connect")
+
+        def first_update(*controls: Any) -> None:
+            # looked up at call time, Page.update may be wrapped meanwhile
+            update = type(page).update
+            if not pending:
+                # still called by a wrapper installed on top of it
+                return update(page, *controls)
+
+            restore(page)
+            fbst.mark("page setup")
+            update(page, *controls)
+            fbst.mark("first update")
+            finish(page)
+
+        page.update = first_update
+        pending.append(first_update)
+        return True
+
+    def done(page: ft.Page) -> None:
+        if pending:
+            restore(page)
+            fbst.mark("page setup")
+
+        finish(page)
+
+    if asyncio.iscoroutinefunction(func):
+
+        async def async_main(page: ft.Page) -> None:
+            if not start(page):
+                return await func(page)
+
+            try:
+                await func(page)
+            finally:
+                done(page)
+
+        return async_main
+
+    def main(page: ft.Page) -> None:
+        if not start(page):
+            return func(page)
+
+        try:
+            func(page)
+        finally:
+            done(page)
+
+    return main
@@ -1,14 +1,25 @@
 #!/usr/bin/env python3
 # -*- coding=utf-8 -*-
 
+import asyncio
+import inspect
+import logging
+import queue
+import threading
+import time
 import traceback
 from typing import Any
 
 import flet as ft
 
+from . import assets as fba
 from . import buttons as fbb
-from . import dialogs as fbdp
 from . import helpers as fbh
+from . import startup as fbst
+
+fbdp = fbst.lazy_import(".dialogs")
+fbs = fbst.lazy_import(".storages")
+fbtk = fbst.lazy_import(".tasks")
 
 
 def setup_alignment(page: ft.Page, w: str = "", v: str = "center", h: str = "center") -> None:
@@ -20,8 +31,11 @@ def setup_alignment(page: ft.Page, w: str = "", v: str = "center", h: str = "cen
     page.horizontal_alignment = getattr(ft.CrossAxisAlignment, h.upper())
 
 
-def setup_fonts(page: ft.Page) -> None:
-    page.fonts = dict(alipuhui="/fonts/AlibabaPuHuiTi-3-55-Regular.ttf")
+def setup_fonts(page: ft.Page, **fonts: Any) -> None:
+    """fonts: family=src, a font file name or stem is resolved under the assets dir"""
+    index = fba.get_asset_index()
+    fonts = fonts or dict(alipuhui="/fonts/AlibabaPuHuiTi-3-55-Regular.ttf")
+    page.fonts = {family: index.font(src) for family, src in fonts.items()}
 
 
 def setup_options(page: ft.Page, icon: str = "/logo.ico", align_kw: dict = {}, **kwargs: Any) -> None:
@@ -69,34 +83,158 @@ def setup_options(page: ft.Page, icon: str = "/logo.ico", align_kw: dict = {}, *
     page.on_error = on_error
 
 
-def page_teardown(teardowns: list) -> None:
+def setup_storage(page: ft.Page, delay: Any = 1.0, backend: Any = None, codec: Any = None) -> Any:
+    """storage used by StorageHelper on this page
+
+    backend replaces page.client_storage, e.g. storages.get_sqlite_storage(path).
+    codec is a storages.ValueCodec to compress/version/chunk stored values.
+    unless delay is None, it is wrapped by a storages.StorageCache, whose
+    pending writes are flushed at teardown.
+    """
+    page.storage_backend = backend
+    page.storage_codec = codec
+    if not hasattr(page, "teardowns"):
+        page.teardowns = []
+
+    # keys derived by StorageHelper.encrypt/decrypt
+    page.teardowns.append(fbs.wipe_crypto_sessions)
+    if delay is None:
+        return backend
+
+    page.storage_cache = fbs.StorageCache(backend or page.client_storage, delay=delay)
+    # send writes made by the other teardowns too
+    page.teardowns.insert(0, dict(func=page.storage_cache.sync, name="storage", after=("window_ui", "tasks")))
+    return page.storage_cache
+
+
+def setup_tasks(page: ft.Page, workers: int = 0, processes: bool = False, timeout: float = 3.0) -> Any:
+    """page.task_manager, quitting is refused while it has running tasks"""
+    fbst.load_all()
+    page.task_manager = fbtk.TaskManager(page, workers=workers, processes=processes)
+    if not hasattr(page, "teardowns"):
+        page.teardowns = []
+
+    page.teardowns.append(dict(func=page.task_manager.shutdown, name="tasks", kwargs=dict(timeout=timeout)))
+    return page.task_manager
+
+
+def can_quit(page: ft.Page) -> bool:
+    if (manager := getattr(page, "task_manager", None)) and manager.busy:
+        return False
+
+    return getattr(page, "can_quit", True)
+
+
+def get_teardown_task(t: Any) -> dict:
+    """func, (func,), (func, args), (func, args, {})
+    or dict(func=, args=, kwargs=, name=, after=(names), timeout=)
+    """
+    if isinstance(t, dict):
+        task = dict(t)
+    elif isinstance(t, tuple):
+        # (func, args, {})
+        task = dict(zip(("func", "args", "kwargs"), t))
+    else:
+        task = dict(func=t)
+
+    func = task["func"]
+    task.setdefault("name", getattr(func, "__qualname__", None) or repr(func))
+    task.setdefault("args", ())
+    task.setdefault("kwargs", {})
+    task.setdefault("after", ())
+    return task
+
+
+def run_teardown(task: dict, results: queue.SimpleQueue) -> None:
+    started = time.monotonic()
+    status, error = "ok", ""
+    try:
+        result = task["func"](*task["args"], **task["kwargs"])
+        if inspect.isawaitable(result):
+            asyncio.run(result)
+    except Exception as ex:
+        status, error = "error", repr(ex)
+
+    results.put((task["name"], status, error, time.monotonic() - started))
+
+
+def page_teardown(
+    teardowns: list, timeout: float = 10.0, task_timeout: float = 5.0, workers: int = 8
+) -> dict:
+    """run teardowns in threads, return {name: dict(status=, duration=, error=)}
+
+    a task starts once the tasks named in its "after" are finished, failed or
+    timed out, unknown names are ignored. a task running longer than its
+    timeout (task_timeout by default) is left behind in its daemon thread, so
+    a hung teardown cannot block quitting for more than timeout seconds.
+    status is ok, error, timeout or skipped (not started before timeout, or a
+    dependency cycle).
+    """
+    fbst.load_all()
+    tasks = {}
     for t in teardowns:
-        args = ()
-        kargs = {}
-        if isinstance(t, tuple):
-            # (func, args, {})
-            if len(t) == 3:
-                func, args, kargs = t
-            elif len(t) == 2:
-                func, args = t
-            else:
-                func = t[0]
-
-        else:
-            func = t
-
+        task = get_teardown_task(t)
+        name = task["name"]
+        while name in tasks:
+            name += "+"
+
+        task["name"] = name
+        tasks[name] = task
+
+    report = {name: dict(status="skipped", duration=0.0, error="") for name in tasks}
+    results = queue.SimpleQueue()
+    pending = list(tasks)
+    running = {}  # name: (start, deadline)
+    started = time.monotonic()
+    deadline = started + timeout if timeout else None
+    while pending or running:
+        for name in list(pending):
+            if len(running) >= max(1, workers):
+                break
+
+            if all(n not in running and n not in pending for n in tasks[name]["after"]):
+                pending.remove(name)
+                limit = tasks[name].get("timeout", task_timeout)
+                now = time.monotonic()
+                running[name] = (now, now + limit if limit else None)
+                threading.Thread(target=run_teardown, args=(tasks[name], results), daemon=True).start()
+
+        if not running:
+            # what is left depends on each other
+            break
+
+        ends = [d for d in [deadline, *(end for _, end in running.values())] if d is not None]
+        wait = max(0.0, min(ends) - time.monotonic()) if ends else None
         try:
-            func(*args, **kargs)
-        except Exception:
+            name, status, error, duration = results.get(timeout=wait)
+            if name in running:
+                running.pop(name)
+                report[name].update(status=status, error=error, duration=duration)
+        except queue.Empty:
             pass
 
+        now = time.monotonic()
+        for name, (start, end) in list(running.items()):
+            if (end is not None and now >= end) or (deadline is not None and now >= deadline):
+                running.pop(name)
+                report[name].update(status="timeout", duration=now - start)
+
+        if deadline is not None and now >= deadline:
+            break
+
+    for name, item in report.items():
+        if item["status"] != "ok":
+            logging.warning(f"teardown {name}: {item['status']} {item['error']}".rstrip())
+
+    return report
+
 
 def setup_events(page: ft.Page, **kwargs: Any) -> None:
     def really_quit(dlg: Any = None):
         if dlg:
             page.close(dlg)
 
-        page_teardown(getattr(page, "teardowns", []))
+        page.teardown_report = page_teardown(getattr(page, "teardowns", []), **kwargs.get("teardown_kw", {}))
         page.window.visible = False
         page.window.prevent_close = False
         page.window.close()
@@ -111,14 +249,15 @@ def setup_events(page: ft.Page, **kwargs: Any) -> None:
 
     def window_event(e):
         if e.data == "close":
-            if hasattr(page, "can_quit"):
-                if page.can_quit:
-                    do_quit()
-                else:
-                    page.open(ok_dlg)
-
-            else:
+            if can_quit(page):
                 do_quit()
+            else:
+                if manager := getattr(page, "task_manager", None):
+                    # list the running tasks
+                    names = "\n".join(manager.names)
+                    ok_dlg.content = ft.SelectionArea(ft.Text(names)) if names else None
+
+                page.open(ok_dlg)
 
     page.window.prevent_close = True
     page.window.on_event = window_event
@@ -0,0 +1,239 @@
+#!/usr/bin/env python3
+# -*- coding=utf-8 -*-
+
+import importlib
+import inspect
+import json
+import logging
+import sys
+import threading
+import time
+from typing import Any
+
+import flet as ft
+
+FACTORY_MODULES = ("buttons", "choices", "dialogs", "displays", "events", "inputs", "menus", "tables", "tabs")
+# frames of the update machinery, page.update() is counted for their caller
+SKIPPED_FRAMES = {"flush", "request_update", "batch_updates", "__exit__", "wrapper", "first_update"}
+METHODS = (
+    ("helpers", "EchoHelper", ("echo", "write", "apply", "flush")),
+    ("tables", "PagedTable", ("load",)),
+    ("tables", "KeyedTable", ("set_rows",)),
+    ("consoles", "LogView", ("render",)),
+)
+
+
+def get_caller() -> str:
+    frame = sys._getframe(2)
+    while frame.f_back and (
+        frame.f_code.co_name in SKIPPED_FRAMES or frame.f_globals.get("__name__") == "contextlib"
+    ):
+        frame = frame.f_back
+
+    return f"{frame.f_globals.get('__name__', '').rpartition('.')[2]}.{frame.f_code.co_name}"
+
+
+class Profiler:
+    """opt-in counters of fletbox calls and page traffic, see enable()
+
+    every call site gets calls, wall time (total and max), controls created
+    and approximate bytes sent to the client. times and controls of nested
+    calls are included in their callers. page.update() is split by its
+    caller, e.g. "page.update<events.on_tap_top".
+    """
+
+    def __init__(self) -> None:
+        self.stats = {}
+        self.lock = threading.Lock()
+        self.local = threading.local()
+        self.patches = []
+        self.pages = []
+        self.timer = None
+        self.started = time.monotonic()
+
+    def counter(self, name: str) -> int:
+        return getattr(self.local, name, 0)
+
+    def add(self, name: str, value: int) -> None:
+        setattr(self.local, name, self.counter(name) + value)
+
+    def record(self, site: str, elapsed: float, controls: int = 0, size: int = 0) -> None:
+        with self.lock:
+            if (item := self.stats.get(site)) is None:
+                item = self.stats[site] = dict(calls=0, time=0.0, max=0.0, controls=0, bytes=0)
+
+            item["calls"] += 1
+            item["time"] += elapsed
+            item["max"] = max(item["max"], elapsed)
+            item["controls"] += controls
+            item["bytes"] += size
+
+    def wrap(self, func: Any, site: str, by_caller: bool = False) -> Any:
+        def wrapper(*args: Any, **kwargs: Any) -> Any:
+            name = site
+            if by_caller:
+                name = f"{site}<{get_caller()}"
+
+            controls = self.counter("controls")
+            size = self.counter("bytes")
+            started = time.perf_counter()
+            try:
+                return func(*args, **kwargs)
+            finally:
+                self.record(
+                    name,
+                    time.perf_counter() - started,
+                    self.counter("controls") - controls,
+                    self.counter("bytes") - size,
+                )
+
+        wrapper.__wrapped__ = func
+        return wrapper
+
+    def patch(self, obj: Any, name: str, wrapper: Any) -> None:
+        owned = name in vars(obj)
+        self.patches.append((obj, name, vars(obj).get(name) if owned else None, owned, wrapper))
+        setattr(obj, name, wrapper)
+
+    def instrument_controls(self) -> None:
+        init = ft.Control.__init__
+
+        def counted_init(control: Any, *args: Any, **kwargs: Any) -> None:
+            self.add("controls", 1)
+            init(control, *args, **kwargs)
+
+        self.patch(ft.Control, "__init__", counted_init)
+
+    def instrument_modules(self) -> None:
+        for name in FACTORY_MODULES:
+            module = importlib.import_module(f"fletbox.{name}")
+            for attr, func in list(vars(module).items()):
+                if (
+                    inspect.isfunction(func)
+                    and func.__module__ == module.__name__
+                    and not attr.startswith("_")
+                ):
+                    self.patch(module, attr, self.wrap(func, f"{name}.{attr}"))
+
+        for name, cls_name, methods in METHODS:
+            cls = getattr(importlib.import_module(f"fletbox.{name}"), cls_name)
+            for method in methods:
+                self.patch(cls, method, self.wrap(getattr(cls, method), f"{cls_name}.{method}"))
+
+    def instrument_page_methods(self) -> None:
+        # patched on the class, instance attributes like the page.update of
+        # helpers.timed_app() stay untouched and still reach the wrapper
+        def wrap_method(method: Any, profiled: Any) -> Any:
+            def wrapper(page: ft.Page, *args: Any, **kwargs: Any) -> Any:
+                func = profiled if page in self.pages else method
+                return func(page, *args, **kwargs)
+
+            return wrapper
+
+        for name in ("update", "open", "close"):
+            method = getattr(ft.Page, name)
+            profiled = self.wrap(method, f"page.{name}", by_caller=True)
+            self.patch(ft.Page, name, wrap_method(method, profiled))
+
+    def instrument_page(self, page: ft.Page) -> None:
+
+        # private in flet, only used to measure the size of sent commands
+        if (conn := getattr(page, "_Page__conn", None)) and "send_commands" not in vars(conn):
+            send = conn.send_commands
+            encoder = importlib.import_module("flet.core.protocol").CommandEncoder
+
+            def send_commands(session_id: str, commands: list) -> Any:
+                try:
+                    self.add("bytes", len(json.dumps(commands, cls=encoder, separators=(",", ":"))))
+                except Exception:
+                    pass
+
+                return send(session_id, commands)
+
+            self.patch(conn, "send_commands", send_commands)
+
+        self.pages.append(page)
+
+    def snapshot(self, reset: bool = False, top: int = 0) -> dict:
+        """{site: dict(calls=, time=, max=, controls=, bytes=)}, slowest first"""
+        with self.lock:
+            items = sorted(self.stats.items(), key=lambda kv: kv[1]["time"], reverse=True)
+            result = {site: dict(item) for site, item in items[: top or None]}
+            if reset:
+                self.stats.clear()
+                self.started = time.monotonic()
+
+        return result
+
+    def log(self, top: int = 10, reset: bool = True) -> None:
+        elapsed = time.monotonic() - self.started
+        items = [
+            f"{site} n={s['calls']} {s['time'] * 1000:.1f}ms max={s['max'] * 1000:.1f}ms "
+            f"controls={s['controls']} bytes={s['bytes']}"
+            for site, s in self.snapshot(reset, top).items()
+        ]
+        if items:
+            logging.info(f"profile {elapsed:.0f}s: " + "; ".join(items))
+
+    def log_every(self, interval: float, top: int = 10) -> None:
+        def run() -> None:
+            if self.timer:
+                self.log(top)
+                self.log_every(interval, top)
+
+        self.timer = threading.Timer(interval, run)
+        self.timer.daemon = True
+        self.timer.start()
+
+    def stop(self) -> None:
+        if self.timer:
+            self.timer.cancel()
+            self.timer = None
+
+        for obj, name, original, owned, wrapper in reversed(self.patches):
+            if vars(obj).get(name) is not wrapper:
+                # replaced or removed by someone else meanwhile, leave theirs
+                continue
+
+            if owned:
+                setattr(obj, name, original)
+            else:
+                delattr(obj, name)
+
+        self.patches.clear()
+        self.pages.clear()
+
+
+profiler = None
+
+
+def enable(page: Any = None, interval: float = 0, top: int = 10) -> Profiler:
+    """start profiling, interval logs the top sites every interval seconds"""
+    global profiler
+    if profiler is None:
+        profiler = Profiler()
+        profiler.instrument_controls()
+        profiler.instrument_page_methods()
+        profiler.instrument_modules()
+        if interval:
+            profiler.log_every(interval, top)
+
+    if page is not None and page not in profiler.pages:
+        profiler.instrument_page(page)
+        if not hasattr(page, "teardowns"):
+            page.teardowns = []
+
+        page.teardowns.append(dict(func=disable, name="profiling"))
+
+    return profiler
+
+
+def disable() -> None:
+    global profiler
+    if profiler:
+        profiler.stop()
+        profiler = None
+
+
+def snapshot(reset: bool = False, top: int = 0) -> dict:
+    return profiler.snapshot(reset, top) if profiler else {}
@@ -0,0 +1,74 @@
+#!/usr/bin/env python3
+# -*- coding=utf-8 -*-
+
+import importlib
+import importlib.util
+import logging
+import os
+import sys
+import time
+from typing import Any
+
+import fletbox
+
+# fast start: set FLETBOX_FAST_START=1, always on for frozen (PyInstaller) builds
+enabled = os.environ.get("FLETBOX_FAST_START", "") not in ("", "0") or bool(getattr(sys, "frozen", False))
+phases = {}
+last = fletbox.started
+lazy_modules = []
+
+
+def lazy_import(name: str, package: str = "fletbox") -> Any:
+    """import a module, in fast start mode it is executed on first attribute access
+
+    LazyLoader is not thread-safe before python 3.12, two threads touching a
+    lazy module first at the same time may see it half executed. call
+    load_all() before starting threads which may use it, fletbox does so for
+    the echo consumer, task pools, teardowns and after the first update.
+    """
+    fullname = importlib.util.resolve_name(name, package)
+    if fullname in sys.modules:
+        # import_module() would touch and so load a lazy module
+        return sys.modules[fullname]
+
+    if not enabled:
+        return importlib.import_module(fullname)
+
+    spec = importlib.util.find_spec(fullname)
+    loader = importlib.util.LazyLoader(spec.loader)
+    spec.loader = loader
+    module = importlib.util.module_from_spec(spec)
+    sys.modules[fullname] = module
+    loader.exec_module(module)
+    lazy_modules.append(module)
+    parent, _, child = fullname.rpartition(".")
+    if parent in sys.modules:
+        setattr(sys.modules[parent], child, module)
+
+    return module
+
+
+def load_all() -> None:
+    """execute all modules deferred by lazy_import()"""
+    while lazy_modules:
+        # any attribute access executes a lazy module
+        getattr(lazy_modules.pop(), "__name__")
+
+
+def mark(phase: str) -> float:
+    """record the time since the previous mark as phase"""
+    global last
+    now = time.perf_counter()
+    phases[phase] = phases.get(phase, 0.0) + now - last
+    last = now
+    return phases[phase]
+
+
+def report() -> dict:
+    """{phase: seconds} since fletbox was imported, plus the total"""
+    return phases | dict(total=sum(phases.values()))
+
+
+def log_report() -> None:
+    items = " ".join(f"{k}={v * 1000:.0f}ms" for k, v in report().items())
+    logging.info(f"startup: {items}")
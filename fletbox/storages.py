@@ -0,0 +1,520 @@
+#!/usr/bin/env python3
+# -*- coding=utf-8 -*-
+
+import base64
+import contextlib
+import json
+import os
+import re
+import sqlite3
+import sys
+import threading
+import zlib
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Any
+
+MISSING = object()
+
+
+def run_many(func: Any, items: Any, workers: int = 8) -> list:
+    """call func for each item concurrently, client storage calls are
+    round-trips to the flet client which can be in flight together"""
+    items = list(items)
+    if len(items) < 2:
+        return [func(item) for item in items]
+
+    with ThreadPoolExecutor(min(workers, len(items))) as pool:
+        return list(pool.map(func, items))
+
+
+def get_many(storage: Any, keys: Any) -> dict:
+    if hasattr(storage, "get_many"):
+        return storage.get_many(keys)
+
+    keys = list(keys)
+    return dict(zip(keys, run_many(storage.get, keys)))
+
+
+def set_many(storage: Any, items: dict) -> None:
+    if hasattr(storage, "set_many"):
+        storage.set_many(items)
+    else:
+        run_many(lambda item: storage.set(*item), items.items())
+
+
+def remove_many(storage: Any, keys: Any) -> None:
+    if hasattr(storage, "remove_many"):
+        storage.remove_many(keys)
+    else:
+        run_many(storage.remove, keys)
+
+
+class StorageCache:
+    """read-through, write-behind cache with the interface of page.client_storage
+
+    reads are served from memory after the first round-trip, writes are kept
+    in a dirty set and sent in one batch after delay seconds, at teardown or
+    on sync(). with delay=0 writes are sent on sync()/teardown only.
+    """
+
+    def __init__(self, storage: Any, delay: float = 1.0) -> None:
+        self.storage = storage
+        self.delay = delay
+        self.values = {}
+        self.dirty = set()
+        self.lock = threading.RLock()
+        self.sync_lock = threading.Lock()
+        self.timer = None
+
+    def get(self, key: str) -> Any:
+        with self.lock:
+            if key in self.values:
+                value = self.values[key]
+                return None if value is MISSING else value
+
+        # round-trip outside the lock, a set() in the meantime wins
+        value = self.storage.get(key)
+        with self.lock:
+            value = self.values.setdefault(key, MISSING if value is None else value)
+            return None if value is MISSING else value
+
+    def get_many(self, keys: Any) -> dict:
+        with self.lock:
+            values = {key: self.values.get(key, MISSING) for key in keys}
+
+        if misses := [key for key, value in values.items() if value is MISSING and key not in self.values]:
+            fetched = get_many(self.storage, misses)
+            with self.lock:
+                for key, value in fetched.items():
+                    values[key] = self.values.setdefault(key, MISSING if value is None else value)
+
+        return {key: None if value is MISSING else value for key, value in values.items()}
+
+    def set(self, key: str, value: Any) -> bool:
+        self.set_many({key: value})
+        return True
+
+    def set_many(self, items: dict) -> None:
+        with self.lock:
+            self.values.update(items)
+            self.dirty.update(items)
+            self.schedule()
+
+    def remove(self, key: str) -> bool:
+        self.remove_many([key])
+        return True
+
+    def remove_many(self, keys: Any) -> None:
+        with self.lock:
+            for key in keys:
+                self.values[key] = MISSING
+                self.dirty.add(key)
+
+            self.schedule()
+
+    def contains_key(self, key: str) -> bool:
+        with self.lock:
+            if key in self.values:
+                return self.values[key] is not MISSING
+
+        return self.storage.contains_key(key)
+
+    def get_keys(self, key_prefix: str) -> list:
+        keys = set(self.storage.get_keys(key_prefix))
+        with self.lock:
+            for key in self.dirty:
+                if key.startswith(key_prefix):
+                    if self.values[key] is MISSING:
+                        keys.discard(key)
+                    else:
+                        keys.add(key)
+
+        return sorted(keys)
+
+    def clear(self) -> bool:
+        with self.lock:
+            self.values.clear()
+            self.dirty.clear()
+
+        return self.storage.clear()
+
+    def schedule(self) -> None:
+        if not self.timer and self.delay:
+            self.timer = threading.Timer(self.delay, self.sync)
+            self.timer.daemon = True
+            self.timer.start()
+
+    def sync(self) -> None:
+        """write all dirty keys to the storage now"""
+        with self.sync_lock:
+            with self.lock:
+                if self.timer:
+                    self.timer.cancel()
+                    self.timer = None
+
+                changes = {key: self.values[key] for key in self.dirty}
+                self.dirty.clear()
+
+            removed = [key for key, value in changes.items() if value is MISSING]
+            try:
+                set_many(self.storage, {key: value for key, value in changes.items() if value is not MISSING})
+                changes = dict.fromkeys(removed)
+                remove_many(self.storage, removed)
+            except Exception:
+                # e.g. a client timeout, write them with the next sync unless changed again meanwhile
+                with self.lock:
+                    self.dirty.update(key for key in changes if key in self.values)
+
+                raise
+
+    def invalidate(self, key: str = "") -> None:
+        """forget cached values (not dirty ones), e.g. after another client changed them"""
+        with self.lock:
+            for k in [key] if key else list(self.values):
+                if k not in self.dirty:
+                    self.values.pop(k, None)
+
+
+def get_config_dir(app_org: str, app_name: str) -> Path:
+    """per-user config folder of the app, created if missing"""
+    if sys.platform == "win32":
+        root = Path(os.environ.get("APPDATA") or Path.home() / "AppData" / "Roaming")
+    elif sys.platform == "darwin":
+        root = Path.home() / "Library" / "Application Support"
+    else:
+        root = Path(os.environ.get("XDG_CONFIG_HOME") or Path.home() / ".config")
+
+    path = root / app_org / app_name
+    path.mkdir(parents=True, exist_ok=True)
+    return path
+
+
+class SqliteStorage:
+    """local storage backend with the interface of page.client_storage
+
+    values are stored as json in a sqlite file, all rows are loaded into
+    memory on open so reads do not touch the disk. works without a page.
+    """
+
+    def __init__(self, path: Any) -> None:
+        self.path = str(path)
+        self.lock = threading.Lock()
+        self.conn = sqlite3.connect(self.path, check_same_thread=False, isolation_level=None)
+        self.conn.execute("pragma journal_mode=wal")
+        self.conn.execute("create table if not exists kv (key text primary key, value text not null)")
+        self.values = dict(self.conn.execute("select key, value from kv"))
+
+    def get(self, key: str) -> Any:
+        if (text := self.values.get(key)) is not None:
+            return json.loads(text)
+
+    def get_many(self, keys: Any) -> dict:
+        return {key: self.get(key) for key in keys}
+
+    def set(self, key: str, value: Any) -> bool:
+        self.set_many({key: value})
+        return True
+
+    @contextlib.contextmanager
+    def transaction(self) -> Any:
+        """one explicit transaction, the connection autocommits otherwise, hold self.lock"""
+        self.conn.execute("begin")
+        try:
+            yield self.conn
+        except BaseException:
+            self.conn.execute("rollback")
+            raise
+
+        self.conn.execute("commit")
+
+    def set_many(self, items: dict) -> None:
+        rows = [(key, json.dumps(value, ensure_ascii=False)) for key, value in items.items()]
+        with self.lock:
+            with self.transaction() as conn:
+                conn.executemany("insert or replace into kv (key, value) values (?, ?)", rows)
+
+            # the in-memory copy follows the disk only after the commit
+            self.values.update(rows)
+
+    def remove(self, key: str) -> bool:
+        self.remove_many([key])
+        return True
+
+    def remove_many(self, keys: Any) -> None:
+        keys = list(keys)
+        with self.lock:
+            with self.transaction() as conn:
+                conn.executemany("delete from kv where key = ?", [(key,) for key in keys])
+
+            for key in keys:
+                self.values.pop(key, None)
+
+    def contains_key(self, key: str) -> bool:
+        return key in self.values
+
+    def get_keys(self, key_prefix: str) -> list:
+        return sorted(key for key in list(self.values) if key.startswith(key_prefix))
+
+    def clear(self) -> bool:
+        with self.lock:
+            with self.transaction() as conn:
+                conn.execute("delete from kv")
+
+            self.values.clear()
+
+        return True
+
+    def close(self) -> None:
+        with self.lock:
+            self.conn.close()
+
+
+sqlite_storages = {}
+
+
+def get_sqlite_storage(path: Any) -> SqliteStorage:
+    """one SqliteStorage per file in the process, they keep an in-memory copy"""
+    path = str(Path(path).resolve())
+    if path not in sqlite_storages:
+        sqlite_storages[path] = SqliteStorage(path)
+
+    return sqlite_storages[path]
+
+
+class CryptoSession:
+    """encrypt/decrypt compatible with flet.security, deriving keys once
+
+    flet.security derives a key (PBKDF2, 600000 iterations) for every value,
+    with a random salt each time. the session encrypts all new values with
+    one session salt and keeps derived keys in a bounded LRU by salt, so the
+    expensive derivation runs once per salt instead of once per value.
+    wipe() zeroes the cached keys (best effort, python may keep copies).
+    """
+
+    iterations = 600000
+
+    def __init__(self, secret_key: str, max_keys: int = 256) -> None:
+        self.secret_key = secret_key
+        self.max_keys = max_keys
+        self.salt = os.urandom(16)
+        self.keys = OrderedDict()
+        self.deriving = {}
+        self.lock = threading.Lock()
+
+    def derive(self, salt: bytes) -> bytearray:
+        from cryptography.hazmat.primitives import hashes
+        from cryptography.hazmat.primitives.kdf.pbkdf2 import PBKDF2HMAC
+
+        kdf = PBKDF2HMAC(algorithm=hashes.SHA256(), length=32, salt=salt, iterations=self.iterations)
+        return bytearray(base64.urlsafe_b64encode(kdf.derive(self.secret_key.encode("utf-8"))))
+
+    def fernet(self, salt: bytes) -> Any:
+        from cryptography.fernet import Fernet
+
+        with self.lock:
+            if (key := self.keys.get(salt)) is not None:
+                self.keys.move_to_end(salt)
+                return Fernet(bytes(key))
+
+            salt_lock = self.deriving.setdefault(salt, threading.Lock())
+
+        # derive outside the main lock, keys of other salts can be derived in parallel,
+        # threads waiting for the same salt reuse the key once it is derived
+        with salt_lock:
+            if (key := self.keys.get(salt)) is None:
+                key = self.derive(salt)
+
+            with self.lock:
+                self.keys[salt] = key
+                self.deriving.pop(salt, None)
+                while len(self.keys) > self.max_keys:
+                    self.keys.popitem(last=False)[1][:] = bytes(len(key))
+
+                return Fernet(bytes(key))
+
+    def encrypt(self, text: str) -> str:
+        token = self.fernet(self.salt).encrypt(text.encode("utf-8"))
+        return base64.urlsafe_b64encode(self.salt + token).decode()
+
+    def decrypt(self, data: str) -> str:
+        raw = base64.urlsafe_b64decode(data)
+        return self.fernet(raw[:16]).decrypt(raw[16:]).decode("utf-8")
+
+    def encrypt_many(self, texts: Any) -> list:
+        fernet = self.fernet(self.salt)
+        return [
+            base64.urlsafe_b64encode(self.salt + fernet.encrypt(t.encode("utf-8"))).decode() for t in texts
+        ]
+
+    def decrypt_many(self, items: Any, workers: int = 4) -> list:
+        """keys of distinct salts are derived in a thread pool, items failed to decrypt are returned as is"""
+
+        def decrypt(data: str) -> str:
+            try:
+                return self.decrypt(data)
+            except Exception:
+                return data
+
+        return run_many(decrypt, items, workers)
+
+    def wipe(self) -> None:
+        with self.lock:
+            for key in self.keys.values():
+                key[:] = bytes(len(key))
+
+            self.keys.clear()
+
+
+crypto_sessions = {}
+
+
+def get_crypto_session(secret_key: str) -> CryptoSession:
+    if secret_key not in crypto_sessions:
+        crypto_sessions[secret_key] = CryptoSession(secret_key)
+
+    return crypto_sessions[secret_key]
+
+
+def wipe_crypto_sessions() -> None:
+    while crypto_sessions:
+        crypto_sessions.popitem()[1].wipe()
+
+
+# suffix of the keys holding chunks of a value, unlikely in real keys
+CHUNK_SUFFIX = "#fbchunk"
+
+
+def chunk_key(key: str, index: int) -> str:
+    return f"{key}{CHUNK_SUFFIX}{index}"
+
+
+def is_chunk_key(key: str) -> bool:
+    return bool(re.search(rf"{CHUNK_SUFFIX}\d+$", key))
+
+
+class ValueCodec:
+    """versioned, compressed and chunked values for StorageHelper
+
+    values are stored in an envelope: {"__fbv__": version, ...}
+        "v": value, small values are kept as they are
+        "z": 1, "d": text, json compressed by zlib and base64 encoded
+        "n": count, the json/compressed text is split into count chunks
+             stored at "key#fbchunk0", "key#fbchunk1", ... for backends limiting value size
+    values read with an older version (0 for values stored without codec)
+    go through migrations[version](value) until the current version and are
+    written back if write_back is true.
+    """
+
+    marker = "__fbv__"
+
+    def __init__(
+        self,
+        version: int = 1,
+        migrations: dict = {},
+        compress_size: int = 1024,
+        chunk_size: int = 0,
+        level: int = 6,
+        write_back: bool = True,
+    ) -> None:
+        self.version = version
+        self.migrations = migrations
+        self.compress_size = compress_size
+        self.chunk_size = chunk_size
+        self.level = level
+        self.write_back = write_back
+
+    def is_envelope(self, stored: Any) -> bool:
+        return isinstance(stored, dict) and self.marker in stored
+
+    def chunk_count(self, stored: Any) -> int:
+        return stored.get("n", 0) if self.is_envelope(stored) else 0
+
+    def dump(self, key: str, value: Any) -> dict:
+        """return {storage key: stored value} of value"""
+        env = {self.marker: self.version}
+        text = ""
+        if self.compress_size or self.chunk_size:
+            text = json.dumps(value, separators=(",", ":"), ensure_ascii=False)
+
+        if self.compress_size and len(text) >= self.compress_size:
+            text = base64.b64encode(zlib.compress(text.encode("utf-8"), self.level)).decode()
+            env["z"] = 1
+
+        if self.chunk_size and len(text) > self.chunk_size:
+            parts = [text[i : i + self.chunk_size] for i in range(0, len(text), self.chunk_size)]
+            env["n"] = len(parts)
+            return {key: env} | {chunk_key(key, i): part for i, part in enumerate(parts)}
+
+        if env.get("z"):
+            env["d"] = text
+        else:
+            env["v"] = value
+
+        return {key: env}
+
+    def load(self, key: str, stored: Any, chunks: dict) -> tuple:
+        """return (value, version) of a stored value"""
+        if not self.is_envelope(stored):
+            return stored, 0
+
+        if "v" in stored:
+            return stored["v"], stored[self.marker]
+
+        if count := stored.get("n"):
+            text = "".join(chunks.get(chunk_key(key, i)) or "" for i in range(count))
+        else:
+            text = stored["d"]
+
+        if stored.get("z"):
+            text = zlib.decompress(base64.b64decode(text)).decode("utf-8")
+
+        return json.loads(text), stored[self.marker]
+
+    def migrate(self, value: Any, version: int) -> Any:
+        while version < self.version:
+            if func := self.migrations.get(version):
+                value = func(value)
+
+            version += 1
+
+        return value
+
+    def read_many(self, storage: Any, keys: Any) -> dict:
+        stored = get_many(storage, keys)
+        chunks = [chunk_key(k, i) for k, v in stored.items() for i in range(self.chunk_count(v))]
+        chunks = get_many(storage, chunks) if chunks else {}
+        values = {}
+        migrated = {}
+        for key, item in stored.items():
+            value, version = self.load(key, item, chunks)
+            if item is not None and version < self.version:
+                value = migrated[key] = self.migrate(value, version)
+
+            values[key] = value
+
+        if migrated and self.write_back:
+            self.write_many(storage, migrated)
+
+        return values
+
+    def write_many(self, storage: Any, items: dict) -> None:
+        old = get_many(storage, items) if self.chunk_size else {}
+        entries = {}
+        stale = []
+        for key, value in items.items():
+            entries |= self.dump(key, value)
+            # chunks left by a longer previous value
+            count = self.chunk_count(entries[key])
+            stale += [chunk_key(key, i) for i in range(count, self.chunk_count(old.get(key)))]
+
+        set_many(storage, entries)
+        if stale:
+            remove_many(storage, stale)
+
+    def remove_many(self, storage: Any, keys: Any) -> None:
+        keys = list(keys)
+        old = get_many(storage, keys) if self.chunk_size else {}
+        chunks = [chunk_key(k, i) for k, v in old.items() for i in range(self.chunk_count(v))]
+        remove_many(storage, keys + chunks)
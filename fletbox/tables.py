@@ -1,11 +1,18 @@
 #!/usr/bin/env python3
 # -*- coding=utf-8 -*-
 
+import itertools
+import operator
+from collections.abc import Sequence
 from typing import Any
 
 import flet as ft
 
+from . import buttons as fbb
 from . import displays as fbdp
+from . import startup as fbst
+
+fbds = fbst.lazy_import(".datasets")
 
 
 def table(
@@ -55,3 +62,267 @@ def get_row(values: list = [], cell_kw: dict = {}, **kwargs: Any) -> ft.DataRow:
             cells.append(ft.DataCell(get_cell(c), **cell_kw))
 
     return ft.DataRow(cells, **kwargs)
+
+
+def file_table(path: str, page_size: int = 50, file_kw: dict = {}, **kwargs: Any) -> "PagedTable":
+    """PagedTable of a CSV/JSONL file, only rows of the current page are read
+
+    the table owns the opened file, it is closed when the table is removed
+    from the page or by table.close(), and opened again when it pages.
+    """
+    rows = fbds.FileRows(path, **file_kw)
+    table = PagedTable(rows.columns or [], rows, page_size, total=rows.count, **kwargs)
+    table.owns_source = True
+    return table
+
+
+def split_value(value: Any) -> tuple:
+    if isinstance(value, (tuple, list)):
+        return value[0], value[1]
+
+    return value, {}
+
+
+def patch_cell(cell: ft.DataCell, old: Any, new: Any) -> None:
+    old_data, old_kw = split_value(old)
+    new_data, new_kw = split_value(new)
+    is_text = isinstance(cell.content, ft.Text)
+    if is_text and old_kw == new_kw and not isinstance(new_data, ft.Control):
+        cell.content.value = f"{new_data}"
+    else:
+        cell.content = get_cell(new_data, **new_kw)
+
+
+def patch_row(row: ft.DataRow, old: list, new: list, **kwargs: Any) -> int:
+    """change only the cells of row whose value differs, kwargs as get_row()"""
+    if len(old) != len(new):
+        row.cells = get_row(new, **kwargs).cells
+        return len(new)
+
+    changed = 0
+    for cell, old_value, new_value in zip(row.cells, old, new):
+        if old_value != new_value:
+            patch_cell(cell, old_value, new_value)
+            changed += 1
+
+    return changed
+
+
+class PagedTable(ft.Column):
+    """DataTable which builds rows of the current page only
+
+    source can be:
+        a sequence (list, tuple, ...)
+        an iterator/generator, rows are pulled and kept as pages are visited
+        a callable fetch(offset, limit) returning the rows of one page
+        a datasets.ColumnStore, clicking a column header sorts it
+    total is the row count, or a callable returning it, needed only for fetch.
+    DataRows are reused between pages, only changed cell values are sent.
+    when owns_source is true, the source is closed with the table.
+    """
+
+    owns_source = False
+
+    def __init__(
+        self,
+        columns: list,
+        source: Any,
+        page_size: int = 50,
+        total: Any = None,
+        columns_kw: dict = {},
+        rows_kw: dict = {},
+        table_kw: dict = {},
+        **kwargs: Any,
+    ) -> None:
+        super().__init__(**kwargs)
+        self.source = source
+        self.page_size = page_size
+        self.rows_kw = rows_kw
+        self.count_func = total if callable(total) else None
+        self._total = None if callable(total) else total
+        self.pulled = []
+        self.exhausted = False
+        if not callable(source) and not isinstance(source, Sequence):
+            self.source = iter(source)
+
+        self.page_index = 0
+        self.page_rows = []
+        if isinstance(source, fbds.ColumnStore):
+            columns_kw = dict(columns_kw, on_sort=self.on_sort)
+
+        self.table = ft.DataTable(columns=get_columns(columns, **columns_kw), rows=[], **table_kw)
+        self.info = fbdp.text()
+        self.first_btn = fbb.IconButton("first_page", lambda _: self.go(0), "首页")
+        self.prev_btn = fbb.IconButton("chevron_left", lambda _: self.go(self.page_index - 1), "上一页")
+        self.next_btn = fbb.IconButton("chevron_right", lambda _: self.go(self.page_index + 1), "下一页")
+        self.last_btn = fbb.IconButton("last_page", lambda _: self.go(self.page_count - 1), "末页")
+        pager = [self.first_btn, self.prev_btn, self.info, self.next_btn, self.last_btn]
+        self.controls = [self.table, ft.Row(pager, alignment=ft.MainAxisAlignment.END)]
+        self.load(0)
+
+    @property
+    def total(self) -> Any:
+        """row count, None if unknown yet"""
+        if self._total is None and self.count_func:
+            self._total = self.count_func()
+
+        if self._total is not None:
+            return self._total
+
+        if isinstance(self.source, Sequence):
+            return len(self.source)
+
+        if self.exhausted:
+            return len(self.pulled)
+
+    @property
+    def page_count(self) -> Any:
+        if (total := self.total) is None:
+            return None
+
+        return max(1, -(-total // self.page_size))
+
+    def fetch(self, offset: int, limit: int) -> list:
+        if callable(self.source):
+            return list(self.source(offset, limit))
+
+        if isinstance(self.source, Sequence):
+            return list(self.source[offset : offset + limit])
+
+        if not self.exhausted and len(self.pulled) < offset + limit:
+            size = len(self.pulled)
+            self.pulled.extend(itertools.islice(self.source, offset + limit - size))
+            self.exhausted = len(self.pulled) < offset + limit
+
+        return self.pulled[offset : offset + limit]
+
+    def load(self, index: int) -> None:
+        if (page_count := self.page_count) is not None:
+            index = min(index, page_count - 1)
+
+        index = max(0, index)
+        offset = index * self.page_size
+        rows = self.fetch(offset, self.page_size)
+        if not rows and index:
+            # past the end of an iterator or fetch source
+            return self.load(index - 1)
+
+        self.page_index = index
+        self.bind_rows(rows)
+        self.refresh_pager(offset, len(rows))
+
+    def bind_rows(self, rows: list) -> None:
+        table_rows = self.table.rows[: len(rows)]
+        for row, old, new in zip(table_rows, self.page_rows, rows):
+            patch_row(row, old, new, **self.rows_kw)
+
+        table_rows += get_rows(rows[len(table_rows) :], **self.rows_kw)
+        self.table.rows = table_rows
+        # copy, rows of a sequence source may be changed in place before reload()
+        self.page_rows = [list(row) for row in rows]
+
+    def on_sort(self, e: ft.DataColumnSortEvent) -> None:
+        self.source.sort(e.column_index, e.ascending)
+        self.table.sort_column_index = e.column_index
+        self.table.sort_ascending = e.ascending
+        self.go(0)
+
+    def refresh_pager(self, offset: int, count: int) -> None:
+        total = self.total
+        has_next = offset + count < total if total is not None else count == self.page_size
+        self.info.value = f"{offset + 1 if count else 0}-{offset + count} / {'?' if total is None else total}"
+        self.first_btn.disabled = self.prev_btn.disabled = self.page_index == 0
+        self.next_btn.disabled = not has_next
+        self.last_btn.disabled = not has_next or total is None
+
+    def go(self, index: int) -> None:
+        self.load(index)
+        if self.page:
+            self.update()
+
+    def close(self) -> None:
+        """close the source if it has close(), e.g. a datasets.FileRows"""
+        if close := getattr(self.source, "close", None):
+            close()
+
+    def will_unmount(self) -> None:
+        if self.owns_source:
+            self.close()
+
+    def reload(self) -> None:
+        """fetch the current page again, e.g. after the source changed"""
+        if self.count_func:
+            self._total = None
+
+        self.go(self.page_index)
+
+
+class KeyedTable(ft.DataTable):
+    """DataTable with rows identified by a key, refresh it with update(rows)
+
+    key is the index of the key column or a callable(row) returning the key.
+    update(rows) keeps the DataRow of known keys, changes only the cells
+    whose value differs, then sends a single update for the table. keys
+    must be unique, a repeated key raises ValueError.
+    """
+
+    def __init__(
+        self,
+        columns: list = [],
+        rows: list = [],
+        key: Any = 0,
+        columns_kw: dict = {},
+        rows_kw: dict = {},
+        **kwargs: Any,
+    ) -> None:
+        super().__init__(columns=get_columns(columns, **columns_kw), rows=[], **kwargs)
+        self.key_func = key if callable(key) else operator.itemgetter(key)
+        self.rows_kw = rows_kw
+        self.row_map = {}
+        self.set_rows(rows)
+
+    def set_rows(self, rows: list) -> dict:
+        """apply rows without sending an update, return counts of the changes"""
+        keys = [self.key_func(values) for values in rows]
+        if len(set(keys)) < len(keys):
+            # checked first, the table is left unchanged
+            seen = set()
+            key = next(k for k in keys if k in seen or seen.add(k))
+            raise ValueError(f"duplicate row key: {key!r}")
+
+        stats = dict(inserted=0, deleted=0, changed=0, moved=0)
+        row_map = {}
+        row_list = []
+        for key, values in zip(keys, rows):
+            if old := self.row_map.get(key):
+                old_values, row = old
+                if old_values != values:
+                    stats["changed"] += patch_row(row, old_values, values, **self.rows_kw)
+
+            else:
+                row = get_row(values, **self.rows_kw)
+                stats["inserted"] += 1
+
+            # keep a copy, callers often mutate and pass the same lists again
+            row_map[key] = (list(values), row)
+            row_list.append(row)
+
+        stats["deleted"] = len(self.row_map) - (len(row_map) - stats["inserted"])
+        self.row_map = row_map
+        if not stats["inserted"] and not stats["deleted"]:
+            stats["moved"] = sum(a is not b for a, b in zip(self.rows, row_list))
+
+        if stats["inserted"] or stats["deleted"] or stats["moved"]:
+            self.rows = row_list
+
+        return stats
+
+    def update(self, rows: Any = None) -> Any:
+        if rows is None:
+            return super().update()
+
+        stats = self.set_rows(rows)
+        if self.page and any(stats.values()):
+            super().update()
+
+        return stats
@@ -0,0 +1,209 @@
+#!/usr/bin/env python3
+# -*- coding=utf-8 -*-
+
+import asyncio
+import contextvars
+import os
+import threading
+import time
+from concurrent.futures import CancelledError, ProcessPoolExecutor, ThreadPoolExecutor, TimeoutError
+from typing import Any
+
+current = contextvars.ContextVar("fletbox_task", default=None)
+
+
+def current_task() -> Any:
+    """Task of the running job, None outside of a TaskManager job"""
+    return current.get()
+
+
+class Task:
+    """handle of a submitted job
+
+    jobs call current_task().report(value) to send progress and check
+    task.cancelled to stop early, on_progress(task, value) and on_done(task)
+    are called through page.run_thread(). progress reports are coalesced:
+    while one is waiting to be delivered, newer values only replace it.
+    """
+
+    def __init__(
+        self, manager: "TaskManager", name: str, on_progress: Any = None, on_done: Any = None
+    ) -> None:
+        self.manager = manager
+        self.name = name
+        self.on_progress = on_progress
+        self.on_done = on_done
+        self.future = None
+        self.progress = None
+        self.started = 0.0
+        self.finished = 0.0
+        self.cancel_event = threading.Event()
+        self.lock = threading.Lock()
+        self.dispatching = False
+
+    @property
+    def cancelled(self) -> bool:
+        return self.cancel_event.is_set()
+
+    @property
+    def status(self) -> str:
+        if self.future is None or not self.future.done():
+            return "running" if self.started else "pending"
+
+        if self.cancelled or self.future.cancelled():
+            return "cancelled"
+
+        return "error" if self.future.exception() else "done"
+
+    @property
+    def duration(self) -> float:
+        return ((self.finished or time.monotonic()) - self.started) if self.started else 0.0
+
+    def cancel(self) -> None:
+        self.cancel_event.set()
+        if self.future:
+            self.future.cancel()
+
+    def result(self, timeout: Any = None) -> Any:
+        return self.future.result(timeout)
+
+    def report(self, value: Any) -> None:
+        self.progress = value
+        if not self.on_progress:
+            return
+
+        with self.lock:
+            if self.dispatching:
+                return
+
+            self.dispatching = True
+
+        self.manager.call_ui(self.deliver)
+
+    def deliver(self) -> None:
+        with self.lock:
+            self.dispatching = False
+
+        self.on_progress(self, self.progress)
+
+    def run(self, func: Any, args: tuple, kwargs: dict) -> Any:
+        token = current.set(self)
+        self.started = time.monotonic()
+        try:
+            if not self.cancelled:
+                return func(*args, **kwargs)
+        finally:
+            current.reset(token)
+
+    async def run_async(self, func: Any, args: tuple, kwargs: dict) -> Any:
+        current.set(self)
+        self.started = time.monotonic()
+        return await func(*args, **kwargs)
+
+
+class TaskManager:
+    """bounded pool for background jobs of a page, see options.setup_tasks()
+
+    jobs run in a thread pool, or a process pool for CPU-heavy work when
+    processes is true (func and arguments must be picklable, no progress).
+    coroutine functions run on the page event loop.
+    """
+
+    def __init__(self, page: Any = None, workers: int = 0, processes: bool = False) -> None:
+        self.page = page
+        self.workers = workers or os.cpu_count() or 4
+        self.processes = processes
+        pool = ProcessPoolExecutor if processes else ThreadPoolExecutor
+        self.executor = pool(max_workers=self.workers)
+        self.tasks = []
+        self.lock = threading.Lock()
+        self.counter = 0
+
+    def call_ui(self, func: Any, *args: Any) -> None:
+        if self.page is not None and getattr(self.page, "loop", None):
+            self.page.run_thread(func, *args)
+        else:
+            func(*args)
+
+    def submit(
+        self,
+        func: Any,
+        *args: Any,
+        name: str = "",
+        on_progress: Any = None,
+        on_done: Any = None,
+        **kwargs: Any,
+    ) -> Task:
+        with self.lock:
+            self.counter += 1
+            task = Task(
+                self, name or f"{getattr(func, '__name__', 'task')}-{self.counter}", on_progress, on_done
+            )
+            self.tasks.append(task)
+
+        if asyncio.iscoroutinefunction(func):
+            coro = task.run_async(func, args, kwargs)
+            if self.page is not None and getattr(self.page, "loop", None):
+                task.future = asyncio.run_coroutine_threadsafe(coro, self.page.loop)
+            else:
+                task.future = self.executor.submit(asyncio.run, coro)
+        elif self.processes:
+            task.started = time.monotonic()
+            task.future = self.executor.submit(func, *args, **kwargs)
+        else:
+            task.future = self.executor.submit(task.run, func, args, kwargs)
+
+        task.future.add_done_callback(lambda _: self.finish(task))
+        return task
+
+    async def run(self, func: Any, *args: Any, **kwargs: Any) -> Any:
+        """submit and await the result from a coroutine"""
+        return await asyncio.wrap_future(self.submit(func, *args, **kwargs).future)
+
+    def finish(self, task: Task) -> None:
+        task.finished = time.monotonic()
+        with self.lock:
+            if task in self.tasks:
+                self.tasks.remove(task)
+
+        if task.on_done:
+            self.call_ui(task.on_done, task)
+
+    @property
+    def running(self) -> list:
+        with self.lock:
+            return list(self.tasks)
+
+    @property
+    def busy(self) -> bool:
+        return bool(self.tasks)
+
+    @property
+    def names(self) -> list:
+        return [task.name for task in self.running]
+
+    def cancel_all(self) -> None:
+        for task in self.running:
+            task.cancel()
+
+    def wait(self, timeout: Any = None) -> bool:
+        """wait until all tasks are finished, return False on timeout"""
+        deadline = None if timeout is None else time.monotonic() + timeout
+        for task in self.running:
+            try:
+                task.future.result(None if deadline is None else max(0, deadline - time.monotonic()))
+            except (CancelledError, TimeoutError):
+                if deadline is not None and time.monotonic() >= deadline:
+                    return False
+            except Exception:
+                pass
+
+        return True
+
+    def shutdown(self, cancel: bool = True, timeout: Any = None) -> None:
+        """teardown: cancel or wait for tasks, then stop the pool"""
+        if cancel:
+            self.cancel_all()
+
+        self.wait(timeout)
+        self.executor.shutdown(wait=False, cancel_futures=True)